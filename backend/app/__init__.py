@@ -35,5 +35,14 @@ def create_app(config_class=Config):
     # Registers chat_routes.py to handle chat-related API routes.
     from app.routes.chat_routes import chat_bp
     app.register_blueprint(chat_bp)
+    # Registers metrics_routes.py to report in-process cache and pipeline counters, if METRICS_ENABLED is set.
+    from app.routes.metrics_routes import metrics_bp, metrics_enabled
+    if metrics_enabled:
+        app.register_blueprint(metrics_bp)
+
+    # Memory-map persisted vector indexes up front if configured
+    from app.services.vector_index import preload_indexes, preload_indexes_on_startup
+    if preload_indexes_on_startup:
+        preload_indexes()
     
     return app 
\ No newline at end of file
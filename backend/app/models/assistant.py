@@ -10,4 +10,16 @@ class Assistant(db.Model):
     created_by = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     is_globally_hidden = db.Column(db.Boolean, nullable=True, default=False)
-    short_desc = db.Column(db.Text, nullable=False)
\ No newline at end of file
+    short_desc = db.Column(db.Text, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'system_prompt': self.system_prompt,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'avatar_url': self.avatar_url,
+            'is_globally_hidden': self.is_globally_hidden,
+            'short_desc': self.short_desc
+        }
@@ -0,0 +1,32 @@
+from app.__init__ import db
+from datetime import datetime, timezone
+
+class ChatMessage(db.Model):
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'seq', name='uq_chat_messages_session_seq'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('chat_sessionv1.id', ondelete='CASCADE'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)  # 1-based position within the session
+    role = db.Column(db.String(20), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    token_count = db.Column(db.Integer, nullable=True)  # Content tokens, counted once on insert
+    sentiment_score = db.Column(db.Float, nullable=True)  # VADER compound score of a user message, set once scored
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def to_message(self):
+        """Message in the {"role", "content"} shape the chat API and OpenAI use."""
+        return {"role": self.role, "content": self.content}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'seq': self.seq,
+            'role': self.role,
+            'content': self.content,
+            'token_count': self.token_count,
+            'sentiment_score': self.sentiment_score,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
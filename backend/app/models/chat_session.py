@@ -1,36 +1,78 @@
 from datetime import datetime, timezone
-import json
 from app.__init__ import db
 from sqlalchemy.dialects.postgresql import ARRAY
+from app.utils.embeddings import decode_embedding
+from app.models.chat_message import ChatMessage
+from app.services.token_budget import count_tokens, tokenizer_model
+from sqlalchemy import update, tuple_
+from sqlalchemy.orm import deferred
+from sqlalchemy.orm.attributes import set_committed_value
+import base64
+
+# Fields GET /sessions can return, and the columns each one needs
+LIST_FIELDS = {
+    "id": ("id",),
+    "title": ("title",),
+    "assistant_id": ("assistant_id",),
+    "assistant_name": ("assistant_id",),
+    "assistant_avatar": ("assistant_id",),
+    "goal_ids": ("goal_ids",),
+    "message_count": ("message_count",),
+    "summary": ("summary",),
+    "timestamp": ("timestamp",),
+    "is_deleted": ("is_deleted",),
+    "is_archived": ("is_archived",),
+    "is_ended": ("is_ended",)
+}
+# What the sidebar needs; summary only on request
+DEFAULT_LIST_FIELDS = tuple(field for field in LIST_FIELDS if field != "summary")
+
+def encode_list_cursor(timestamp, session_id):
+    """Opaque cursor for the session list position after (timestamp, id)."""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{session_id}".encode("utf-8")).decode("ascii")
+
+def decode_list_cursor(cursor):
+    """Inverse of encode_list_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        timestamp, session_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(timestamp), int(session_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 class ChatSession(db.Model):
     __tablename__ = "chat_sessionv1"
+    __table_args__ = (
+        db.Index('ix_chat_sessionv1_user_timestamp_id', 'user_email', db.text('timestamp DESC'), db.text('id DESC')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_email = db.Column(db.String(120), nullable=False)
     title = db.Column(db.String(255), nullable=False, default="Untitled Chat")
     assistant_id = db.Column(db.Integer, db.ForeignKey('assistants.id'), nullable=True, default=1)
     goal_ids = db.Column(ARRAY(db.Integer), nullable=False, default=list)
-    messages = db.Column(db.Text, nullable=False, default="[]")
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # Last seq in chat_messages
     summary = db.Column(db.Text, nullable=True)
-    embedding = db.Column(db.Text, nullable=True)
+    embedding = deferred(db.Column(db.LargeBinary, nullable=True))  # float32 bytes, see app.utils.embeddings; loaded on access
+    summary_folded_at = db.Column(db.DateTime(timezone=True), nullable=True)  # When this summary was folded into the user summary
     timestamp = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     is_deleted = db.Column(db.Boolean, nullable=False, default=False)
     is_archived = db.Column(db.Boolean, nullable=False, default=False)
     is_ended = db.Column(db.Boolean, nullable=False, default=False)
 
-    def to_dict(self):
-        # Get assistant name if available
+    def to_dict(self, messages=None):
+        # Get assistant name if available (from the in-process catalog, no query once loaded)
         assistant_name = None
         assistant_avatar = None
         if self.assistant_id:
-            from app.models.assistant import Assistant
-            assistant = Assistant.query.get(self.assistant_id)
+            from app.services.catalog import assistant_catalog
+            assistant = assistant_catalog.get(self.assistant_id)
             if assistant:
-                assistant_name = assistant.name
-                assistant_avatar = assistant.avatar_url
+                assistant_name = assistant['name']
+                assistant_avatar = assistant['avatar_url']
             else:
                 print(f"No assistant found with ID: {self.assistant_id}")
 
+        embedding = decode_embedding(self.embedding)
+
         result = {
             "id": self.id,
             "user_email": self.user_email,
@@ -39,12 +81,109 @@ class ChatSession(db.Model):
             "goal_ids": self.goal_ids if self.goal_ids else [],
             "assistant_name": assistant_name,
             "assistant_avatar": assistant_avatar,
-            "messages": json.loads(self.messages) if self.messages else [],
+            "message_count": self.message_count,
+            "messages": messages if messages is not None else self.get_messages(),
             "summary": self.summary,
-            "embedding": self.embedding,
+            "embedding": embedding.tolist() if embedding is not None else None,
             "timestamp": self.timestamp.isoformat() if self.timestamp else None,
             "is_deleted": self.is_deleted,
             "is_archived": self.is_archived,
             "is_ended": self.is_ended
         }
-        return result 
\ No newline at end of file
+        return result
+
+    @classmethod
+    def list_page(cls, user_email, fields=DEFAULT_LIST_FIELDS, limit=None, cursor=None):
+        """
+        Column-projected listing of a user's non-deleted sessions, newest first, with keyset pagination
+        on (timestamp, id). Only the columns behind `fields` are selected, never messages or embeddings.
+        cursor is a decoded (timestamp, id) from the previous page.
+        Returns (session dicts, encoded cursor for the next page or None).
+        """
+        column_names = {"id", "timestamp"}.union(*(LIST_FIELDS[field] for field in fields))
+        query = db.session.query(*(getattr(cls, name) for name in sorted(column_names))).filter(
+            cls.user_email == user_email,
+            cls.is_deleted == False
+        )
+        if cursor is not None:
+            query = query.filter(tuple_(cls.timestamp, cls.id) < cursor)
+        query = query.order_by(cls.timestamp.desc(), cls.id.desc())
+
+        next_cursor = None
+        if limit is None:
+            rows = query.all()
+        else:
+            rows = query.limit(limit + 1).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_list_cursor(rows[-1].timestamp, rows[-1].id)
+
+        assistants = {}
+        if {"assistant_name", "assistant_avatar"} & set(fields):
+            from app.services.catalog import assistant_catalog
+            assistants = assistant_catalog.all()
+
+        sessions = []
+        for row in rows:
+            values = row._asdict()
+            assistant = assistants.get(values.get("assistant_id")) or {}
+            values["assistant_name"] = assistant.get("name")
+            values["assistant_avatar"] = assistant.get("avatar_url")
+            if values["timestamp"] is not None:
+                values["timestamp"] = values["timestamp"].isoformat()
+            if "goal_ids" in values:
+                values["goal_ids"] = values["goal_ids"] or []
+            sessions.append({field: values[field] for field in fields})
+        return sessions, next_cursor
+
+    def get_messages(self, limit=None, before_seq=None, with_token_counts=False):
+        """
+        Load this session's messages in order as {"role", "content"} dicts.
+        With limit, returns only the latest `limit` messages before before_seq (if given).
+        With with_token_counts, each dict also carries its stored token_count.
+        """
+        query = ChatMessage.query.with_entities(ChatMessage.role, ChatMessage.content, ChatMessage.token_count).filter(
+            ChatMessage.session_id == self.id
+        )
+        if before_seq is not None:
+            query = query.filter(ChatMessage.seq < before_seq)
+        if limit is None:
+            rows = query.order_by(ChatMessage.seq.asc()).all()
+        else:
+            rows = list(reversed(query.order_by(ChatMessage.seq.desc()).limit(limit).all()))
+        if with_token_counts:
+            return [{"role": role, "content": content, "token_count": token_count} for role, content, token_count in rows]
+        return [{"role": role, "content": content} for role, content, _ in rows]
+
+    def append_messages(self, messages):
+        """
+        Append messages to this session without rewriting earlier ones.
+        Sequence numbers are reserved with an atomic UPDATE ... RETURNING on message_count, which also
+        row-locks the session until commit, so concurrent writers can't lose each other's messages.
+        The caller commits.
+        """
+        if not messages:
+            return []
+        last_seq = db.session.execute(
+            update(ChatSession)
+            .where(ChatSession.id == self.id)
+            .values(message_count=ChatSession.message_count + len(messages))
+            .returning(ChatSession.message_count),
+            execution_options={"synchronize_session": False}
+        ).scalar_one()
+        set_committed_value(self, "message_count", last_seq)
+
+        first_seq = last_seq - len(messages) + 1
+        rows = [
+            ChatMessage(
+                session_id=self.id,
+                seq=first_seq + i,
+                role=msg["role"],
+                content=msg["content"],
+                token_count=msg["token_count"] if msg.get("token_count") is not None
+                else count_tokens(msg["content"], tokenizer_model)
+            )
+            for i, msg in enumerate(messages)
+        ]
+        db.session.add_all(rows)
+        return rows
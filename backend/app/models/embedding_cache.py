@@ -0,0 +1,12 @@
+from app.__init__ import db
+from datetime import datetime, timezone
+
+class EmbeddingCache(db.Model):
+    __tablename__ = "embedding_cache"
+    __table_args__ = (
+        db.Index('ix_embedding_cache_created_at', 'created_at'),  # Pruning rows past their retention
+    )
+    model = db.Column(db.String(100), primary_key=True)
+    text_hash = db.Column(db.String(64), primary_key=True)  # sha256 hex of the embedded text
+    embedding = db.Column(db.LargeBinary, nullable=False)  # float32 bytes
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
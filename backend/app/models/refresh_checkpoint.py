@@ -0,0 +1,32 @@
+from app.__init__ import db
+from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+class RefreshCheckpoint(db.Model):
+    """A session a named refresh run (scripts/refresh_summaries.py) has finished; reruns of that run skip it."""
+    __tablename__ = "refresh_checkpoints"
+    run_name = db.Column(db.String(100), primary_key=True)
+    session_id = db.Column(db.Integer, primary_key=True)
+    completed_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    @staticmethod
+    def record(run_name, session_ids):
+        """
+        Mark sessions as done for a run. Runs in the caller's transaction, so the checkpoint
+        is committed together with the results it stands for.
+        """
+        if not session_ids:
+            return
+        now = datetime.now(timezone.utc)
+        statement = pg_insert(RefreshCheckpoint.__table__).values([
+            {"run_name": run_name, "session_id": session_id, "completed_at": now}
+            for session_id in session_ids
+        ]).on_conflict_do_nothing(index_elements=["run_name", "session_id"])
+        db.session.execute(statement)
+
+    @staticmethod
+    def clear(run_name):
+        """Forget a run's progress, so it starts over. Returns the number of checkpoints removed."""
+        count = RefreshCheckpoint.query.filter_by(run_name=run_name).delete()
+        db.session.commit()
+        return count
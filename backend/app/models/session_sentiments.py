@@ -1,16 +1,99 @@
 from app.__init__ import db
 from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# VADER compound score cut-offs for the sentiment label
+POSITIVE_THRESHOLD = 0.3
+NEGATIVE_THRESHOLD = -0.3
+
+def sentiment_label(score):
+    if score >= POSITIVE_THRESHOLD:
+        return "Positive"
+    if score <= NEGATIVE_THRESHOLD:
+        return "Negative"
+    return "Neutral"
 
 class SessionSentiments(db.Model):
+    """
+    One row per session. sentiment_score is the mean of the session's per-message scores, kept as a
+    running aggregate (score_sum / message_count) that each newly scored user message is folded into.
+    """
     __tablename__ = "session_sentiments"
+    __table_args__ = (
+        db.Index('ix_session_sentiments_user_email_session_id', 'user_email', 'session_id'),
+        db.Index('uq_session_sentiments_session_id', 'session_id', unique=True),  # One row per session
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_email = db.Column(db.String(255), nullable=False)
     session_id = db.Column(db.Integer, nullable=False)
     sentiment = db.Column(db.String(255), nullable=False)
     sentiment_score = db.Column(db.Float, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # User messages in the aggregate
+    score_sum = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+    @staticmethod
+    def upsert(rows):
+        """
+        Insert or replace the sentiment of many sessions with one INSERT ... ON CONFLICT (session_id) DO UPDATE.
+        rows: dicts with session_id, user_email, sentiment, sentiment_score, message_count and score_sum.
+        Runs in the caller's transaction.
+        """
+        if not rows:
+            return
+        now = datetime.now(timezone.utc)
+        statement = pg_insert(SessionSentiments.__table__).values([
+            {**row, "created_at": now, "updated_at": now} for row in rows
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=["session_id"],
+            set_={
+                column: statement.excluded[column]
+                for column in ("user_email", "sentiment", "sentiment_score", "message_count", "score_sum", "updated_at")
+            }
+        )
+        db.session.execute(statement)
+
+    @staticmethod
+    def add_message_scores(user_email, session_id, count, total):
+        """
+        Fold `count` newly scored messages, whose scores add up to `total`, into the session's running
+        aggregate with one upsert; the mean and label are recomputed in SQL from the updated sums.
+        Runs in the caller's transaction.
+        """
+        if not count:
+            return
+        table = SessionSentiments.__table__
+        now = datetime.now(timezone.utc)
+        message_count = table.c.message_count + count
+        score_sum = table.c.score_sum + total
+        mean = score_sum / message_count
+        statement = pg_insert(table).values(
+            user_email=user_email,
+            session_id=session_id,
+            sentiment=sentiment_label(total / count),
+            sentiment_score=total / count,
+            message_count=count,
+            score_sum=total,
+            created_at=now,
+            updated_at=now
+        ).on_conflict_do_update(
+            index_elements=["session_id"],
+            set_={
+                "message_count": message_count,
+                "score_sum": score_sum,
+                "sentiment_score": mean,
+                "sentiment": db.case(
+                    (mean >= POSITIVE_THRESHOLD, "Positive"),
+                    (mean <= NEGATIVE_THRESHOLD, "Negative"),
+                    else_="Neutral"
+                ),
+                "updated_at": now
+            }
+        )
+        db.session.execute(statement)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -18,6 +101,7 @@ class SessionSentiments(db.Model):
             'session_id': self.session_id,
             'sentiment': self.sentiment,
             'sentiment_score': self.sentiment_score,
+            'message_count': self.message_count,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
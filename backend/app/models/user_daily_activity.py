@@ -0,0 +1,27 @@
+from app.__init__ import db
+from datetime import timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+class UserDailyActivity(db.Model):
+    """Per-user, per-UTC-day count of non-deleted sessions; the data behind /sessions/stats."""
+    __tablename__ = "user_daily_activity"
+    user_email = db.Column(db.String(120), primary_key=True)
+    activity_date = db.Column(db.Date, primary_key=True)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def record_session(user_email, timestamp, delta=1):
+        """
+        Add delta (1 for a new session, -1 for a deleted one) to the day the session started on.
+        Runs in the caller's transaction; the caller commits with the session change.
+        """
+        activity_date = timestamp.astimezone(timezone.utc).date() if timestamp.tzinfo else timestamp.date()
+        statement = pg_insert(UserDailyActivity.__table__).values(
+            user_email=user_email,
+            activity_date=activity_date,
+            session_count=max(delta, 0)
+        ).on_conflict_do_update(
+            index_elements=["user_email", "activity_date"],
+            set_={"session_count": db.func.greatest(UserDailyActivity.__table__.c.session_count + delta, 0)}
+        )
+        db.session.execute(statement)
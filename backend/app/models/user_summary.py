@@ -1,6 +1,8 @@
 from app.__init__ import db
 from datetime import datetime, timezone
 import json
+import numpy as np
+from app.utils.embeddings import encode_embedding_matrix, decode_embedding_matrix
 
 class UserSummary(db.Model):
     __tablename__ = 'user_summaries'
@@ -9,7 +11,8 @@ class UserSummary(db.Model):
     user_email = db.Column(db.String(255), unique=True, nullable=False)
     summary = db.Column(db.Text, nullable=False)  # Overall user summary
     session_summaries = db.Column(db.Text, nullable=True)  # JSON of past session summaries
-    session_embeddings = db.Column(db.Text, nullable=True)  # JSON of vector embeddings
+    session_embeddings = db.Column(db.LargeBinary, nullable=True)  # Packed session ids + float32 embeddings
+    incremental_updates = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # Since the last full rebuild
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
@@ -19,17 +22,24 @@ class UserSummary(db.Model):
             'user_email': self.user_email,
             'summary': self.summary,
             'session_summaries': json.loads(self.session_summaries) if self.session_summaries else [],
-            'session_embeddings': json.loads(self.session_embeddings) if self.session_embeddings else [],
+            'session_embeddings': self.get_session_embeddings(),
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
 
+    def get_session_embeddings(self):
+        """
+        Decode session embeddings into a dict of session ID -> list of floats.
+        """
+        ids, matrix = decode_embedding_matrix(self.session_embeddings)
+        return {str(session_id): row.tolist() for session_id, row in zip(ids, matrix)}
+
     def add_session_summary(self, session_id, title, timestamp, summary, embedding):
         """
         Add a new session summary and its embedding.
         """
         session_summaries = json.loads(self.session_summaries) if self.session_summaries else []
-        session_embeddings = json.loads(self.session_embeddings) if self.session_embeddings else {}
+        ids, matrix = decode_embedding_matrix(self.session_embeddings)
 
         session_summaries.append({
             'session_id': session_id,
@@ -38,8 +48,11 @@ class UserSummary(db.Model):
             'summary': summary
         })
 
-        session_embeddings[str(session_id)] = embedding  # Store embedding by session ID
+        # Store embedding by session ID, replacing any previous one
+        if embedding is not None:
+            keep = ids != session_id
+            rows = list(matrix[keep]) + [np.asarray(embedding, dtype=np.float32)]
+            self.session_embeddings = encode_embedding_matrix(list(ids[keep]) + [session_id], rows)
 
         self.session_summaries = json.dumps(session_summaries)
-        self.session_embeddings = json.dumps(session_embeddings)
         self.updated_at = datetime.now(timezone.utc)
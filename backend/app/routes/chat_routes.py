@@ -1,31 +1,67 @@
-from flask import Blueprint, request, jsonify
-from app.models.chat_session import ChatSession
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.models.chat_session import ChatSession, LIST_FIELDS, DEFAULT_LIST_FIELDS, encode_list_cursor, decode_list_cursor
 from app.models.user_summary import UserSummary
-from app.models.assistant import Assistant
-from app.models.goals import Goals
-from app.models.session_sentiments import SessionSentiments
-from app.services.ai_service import generate_ai_response, generateSessionSummary, generateUserSummary, generate_embedding, analyze_sentiment
+from app.models.session_sentiments import SessionSentiments, sentiment_label
+from app.models.chat_message import ChatMessage
+from app.models.user_daily_activity import UserDailyActivity
+from app.services.ai_service import generate_ai_response, stream_ai_response, generateSessionSummary, generateUserSummary, generate_embedding, analyze_sentiment, invalidate_trimmed_summaries
+from app.services.vector_index import sync_session_embedding, stamp_user_index
+from app.services.job_queue import enqueue_job, register_job, update_job_payload
+from app.services.catalog import assistant_catalog, goal_catalog
+from app.models.job import Job
 from app.utils.decorators import authenticate
+from app.utils.embeddings import encode_embedding, decode_embedding, encode_embedding_matrix, decode_embedding_matrix
 from app.__init__ import db
 import json
+import numpy as np
+import os
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import undefer
 import logging
 
 logger = logging.getLogger(__name__)
 
 chat_bp = Blueprint('chat', __name__, url_prefix='')
 
+# Rebuild user summaries from all sessions after this many incremental updates (0 = only when asked)
+userSummaryFullRebuildEvery = int(os.getenv("USER_SUMMARY_FULL_REBUILD_EVERY", "20"))
+
 
 @chat_bp.route('/sessions', methods=['GET'])
 @authenticate
 def get_sessions(user_email):
+    """
+    List the user's sessions, newest first, without messages or embeddings (GET /sessions/<id> has those).
+    Pass ?fields=id,title,... to choose the fields returned. Pass ?limit=N to page the list; the
+    response is then {"sessions", "has_more", "next_cursor"}, and ?cursor=<next_cursor> gets the next page.
+    """
     try:
         logger.info(f"[User: {user_email}] Received request to get sessions")
-        sessions = ChatSession.query.filter_by(
-            user_email=user_email,
-            is_deleted=False
-        ).order_by(ChatSession.timestamp.desc()).all()
-        return jsonify([s.to_dict() for s in sessions]), 200
+        fields = request.args.get("fields")
+        fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else DEFAULT_LIST_FIELDS
+        unknown_fields = [field for field in fields if field not in LIST_FIELDS]
+        if unknown_fields:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown_fields)}"}), 400
+
+        limit = request.args.get("limit", type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "limit must be positive"}), 400
+
+        cursor = request.args.get("cursor")
+        try:
+            cursor = decode_list_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        sessions, next_cursor = ChatSession.list_page(user_email, fields=fields, limit=limit, cursor=cursor)
+        if limit is None:
+            return jsonify(sessions), 200
+        return jsonify({
+            "sessions": sessions,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
+        }), 200
     
     except Exception as e:
         logger.error(f"[User: {user_email}] Session Retrieval Error: {e}")
@@ -48,17 +84,18 @@ def initialize_session(user_email):
         session = ChatSession(
             user_email=user_email, 
             title=title, 
-            messages=json.dumps([]), 
             summary="", 
             assistant_id=assistant_id,
             goal_ids=goal_ids
         )
         
         db.session.add(session)
+        db.session.flush()
+        UserDailyActivity.record_session(user_email, session.timestamp)
         db.session.commit()
 
         logger.info(f"[User: {user_email}] Successfully initialized new session with ID: {session.id}")
-        return jsonify(session.to_dict()), 201
+        return jsonify(session.to_dict(messages=[])), 201
     
     except Exception as e:
         logger.error(f"[User: {user_email}] Session Initialization Error: {e}")
@@ -83,29 +120,23 @@ def create_session(user_email):
             is_ended=False
         ).filter(ChatSession.id != session_id).all()
 
-        # Generate summaries for active sessions before ending them
-        for session in active_sessions:
-            messages = json.loads(session.messages)
-            if messages:  # Only generate summary if there are messages
-                session_summary = generateSessionSummary(messages)
-                session.summary = session_summary
-                
-                # Generate embedding for the summary
-                session_embedding = generate_embedding(session_summary)
-                session.summary_embedding = json.dumps(session_embedding)
-
-        # Update user summary if there are active sessions
-        if active_sessions:
-            update_user_summary(user_email)
-        
-        for session in active_sessions:
-            session.is_ended = True
-        
         # Get the new session
         session = ChatSession.query.get(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
 
+        # End them now; summaries, embeddings and the user summary are built by a background job
+        for active_session in active_sessions:
+            active_session.is_ended = True
+
+        if active_sessions:
+            enqueue_job("finalize_sessions", {
+                "user_email": user_email,
+                "session_ids": [s.id for s in active_sessions],
+                "sentiment": False,
+                "regenerate_summary": True
+            }, user_email=user_email)
+
         db.session.commit()
         
         return jsonify(session.to_dict()), 201
@@ -148,19 +179,26 @@ def delete_session(user_email, session_id):
         if not session:
             return jsonify({'error': 'Session not found'}), 404
         
-        if not session.is_ended:
-            end_session(user_email, session_id)
+        # Only ended, unarchived sessions feed the user summary
+        in_user_summary = session.is_ended and not session.is_archived
+        if not session.is_deleted:
+            UserDailyActivity.record_session(user_email, session.timestamp, delta=-1)
 
         session.is_deleted = True
         session.is_archived = True
         session.is_ended = True
 
-        db.session.commit()
+        job = None
+        if in_user_summary:
+            job = enqueue_job("update_user_summary", {"user_email": user_email}, user_email=user_email)
 
-        # Update user summary after session ends
-        update_user_summary(user_email)
+        db.session.commit()
+        sync_session_embedding(session)
 
-        return jsonify({'message': 'Session deleted successfully'})
+        return jsonify({
+            'message': 'Session deleted successfully',
+            'job': job.to_dict() if job else None
+        })
 
     except Exception as e:
         logger.error(f"[User: {user_email}] Error deleting session: {str(e)}")
@@ -175,31 +213,24 @@ def toggle_archive_session(user_email, session_id):
         if not session:
             return jsonify({'error': 'Session not found'}), 404
 
-        # If we're archiving (not unarchiving), generate sentiment
-        if not session.is_archived:
-            try:
-                generate_session_sentiment(user_email, session_id)
-            except Exception as e:
-                logger.error(f"[User: {user_email}] Error generating sentiment for session {session_id}: {e}")
-                # Continue with archiving even if sentiment generation fails
-
-        # Generate summary from messages
-        messages = json.loads(session.messages)
-        if not session.summary:
-            session.summary = generateSessionSummary(messages)
-        if not session.embedding and session.summary:
-            # Generate embedding for this summary
-            embedding = generate_embedding(session.summary)
-            session.embedding = json.dumps(embedding) if embedding else None  # Only store if valid
-            
         #switch status
         session.is_archived = not session.is_archived
-        db.session.commit()
 
-        # Update user summary after session ends
-        update_user_summary(user_email)
+        # Sentiment (when archiving), missing summary/embedding and the user summary are built in the background
+        job = enqueue_job("finalize_sessions", {
+            "user_email": user_email,
+            "session_ids": [session.id],
+            "sentiment": session.is_archived,
+            "regenerate_summary": False
+        }, user_email=user_email)
+
+        db.session.commit()
+        sync_session_embedding(session)
         
-        return jsonify(session.to_dict())
+        return jsonify({
+            **session.to_dict(),
+            'job': job.to_dict()
+        })
 
     except Exception as e:
         logger.error(f"[User: {user_email}] Error archiving session: {str(e)}")
@@ -214,43 +245,52 @@ def end_session(user_email, session_id):
         if not session:
             return jsonify({'error': 'Session not found'}), 404
 
-        # Generate sentiment analysis for the session
-        try:
-            logger.info(f"[User: {user_email}] Generating sentiment for session {session_id}")
-            _generate_session_sentiment(user_email, session_id)
-        except Exception as e:
-            logger.error(f"[User: {user_email}] Error generating sentiment for session {session_id}: {e}")
-            # Continue with ending session even if sentiment generation fails
-
-        # Generate summary from messages
-        messages = json.loads(session.messages)
-        session.summary = generateSessionSummary(messages)
-
-        # Generate embedding for this summary
-        session.embedding = json.dumps(generate_embedding(session.summary))
-
-        # Mark session as ended
+        # Mark session as ended; sentiment, summary, embedding and user summary are built in the background
         session.is_ended = True
+        job = enqueue_job("finalize_sessions", {
+            "user_email": user_email,
+            "session_ids": [session.id],
+            "sentiment": True,
+            "regenerate_summary": True
+        }, user_email=user_email)
         db.session.commit()
 
-        logger.info(f"[User: {user_email}] Successfully ended session {session_id} and generated summaries")
+        logger.info(f"[User: {user_email}] Ended session {session_id}, queued job {job.id} to finalize it")
 
-        # Update user summary after session ends
-        update_user_summary(user_email)
-        
+        # 202: the new summary is built by the job; poll GET /jobs/<id>, then reload the session
         return jsonify({
             **session.to_dict(),
-            'session_summary': session.summary
-        })
+            'job': job.to_dict()
+        }), 202
 
     except Exception as e:
         logger.error(f"[User: {user_email}] Error ending session: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Failed to end session'}), 500
 
+@chat_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@authenticate
+def get_job(user_email, job_id):
+    """
+    Return the status of a background job started by one of the session endpoints.
+    """
+    try:
+        job = Job.query.filter_by(id=job_id, user_email=user_email).first()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict()), 200
+
+    except Exception as e:
+        logger.error(f"[User: {user_email}] Job Retrieval Error: {e}")
+        return jsonify({"error": "Failed to load job"}), 500
+
 @chat_bp.route('/sessions/<int:session_id>', methods=['GET'])
 @authenticate
 def get_session_messages(user_email, session_id):
+    """
+    Return a session's messages. Pass ?limit=N to page backwards from the latest message,
+    and ?before=<seq> (the previous page's next_before) to fetch the page before that.
+    """
     # Fetch the session
     session = ChatSession.query.filter_by(id=session_id, user_email=user_email).first()
     if not session:
@@ -258,11 +298,22 @@ def get_session_messages(user_email, session_id):
 
     # Return the session messages
     try:
-        messages = json.loads(session.messages)
+        limit = request.args.get("limit", type=int)
+        before_seq = request.args.get("before", type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "limit must be positive"}), 400
+
+        messages = session.get_messages(limit=limit, before_seq=before_seq)
+
+        # Sequence numbers run 1..message_count, so the page's first seq follows from its size
+        end_seq = min(before_seq, session.message_count + 1) if before_seq is not None else session.message_count + 1
+        first_seq = end_seq - len(messages)
         return jsonify({
             "session_id": session.id, 
             "messages": messages, 
-            "title": session.title
+            "title": session.title,
+            "has_more": first_seq > 1,
+            "next_before": first_seq if first_seq > 1 else None
         }), 200
     except Exception as e:
         logger.error(f"Error loading session: {e}")
@@ -292,14 +343,27 @@ def chat_with_ai(user_email):
             return jsonify({"error": "This session has ended. Please create a new session to continue chatting."}), 403
 
         # Load existing messages
-        current_messages = json.loads(session.messages) if session.messages else []
+        current_messages = session.get_messages(with_token_counts=True)
+        new_messages = []
 
         # For initial message, we don't need user input
         if not is_initial and not message:
             return jsonify({"error": "Message is required"}), 400
 
         if not is_initial:
-            current_messages.append({"role": "user", "content": message})
+            new_messages.append({"role": "user", "content": message})
+            current_messages.append(new_messages[-1])
+
+        # Stream the reply as Server-Sent Events if the client asked for it
+        if data.get("stream"):
+            return Response(
+                stream_with_context(_stream_chat_reply(session, current_messages, new_messages, user_email, assistant_id, goal_ids)),
+                mimetype="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no"  # Stop proxies from buffering the stream
+                }
+            )
 
         # Generate AI response
         ai_response = generate_ai_response(
@@ -310,16 +374,18 @@ def chat_with_ai(user_email):
         )
 
         # Update messages
-        current_messages.append({"role": "assistant", "content": ai_response})
+        new_messages.append({"role": "assistant", "content": ai_response})
+        current_messages.append(new_messages[-1])
 
-        # Save updated messages
-        session.messages = json.dumps(current_messages)
+        # Append only this turn's messages
+        session.append_messages(new_messages)
+        _enqueue_message_sentiment(session, new_messages, user_email)
         db.session.commit()
 
         logger.info(f"[User: {user_email}] Successfully got response from AI for session {session_id}")
         return jsonify({
             "message": ai_response,
-            "messages": current_messages  # Return all messages for initial request
+            "messages": [{"role": m["role"], "content": m["content"]} for m in current_messages]  # Return all messages for initial request
         }), 200
 
     except Exception as e:
@@ -327,6 +393,78 @@ def chat_with_ai(user_email):
         db.session.rollback()
         return jsonify({"error": "Failed to get response from AI"}), 500
 
+def _sse_event(event, payload):
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def _stream_chat_reply(session, current_messages, new_messages, user_email, assistant_id, goal_ids):
+    """
+    Forward AI tokens to the client as they arrive and save the reply when the stream closes.
+    If the client disconnects or the upstream stream fails partway, whatever was generated so far is still
+    saved; an upstream failure ends the stream with an error event instead of done.
+    """
+    reply_parts = []
+    completed = False
+    failed = False
+    try:
+        for delta in stream_ai_response(
+            messages=current_messages,
+            user_email=user_email,
+            assistant_id=assistant_id,
+            goal_ids=goal_ids
+        ):
+            reply_parts.append(delta)
+            yield _sse_event("token", {"delta": delta})
+        completed = True
+    except Exception:
+        # Already logged by stream_ai_response
+        failed = True
+
+    finally:
+        ai_response = "".join(reply_parts)
+        if ai_response:
+            new_messages.append({"role": "assistant", "content": ai_response})
+            current_messages.append(new_messages[-1])
+        try:
+            session.append_messages(new_messages)
+            _enqueue_message_sentiment(session, new_messages, user_email)
+            db.session.commit()
+            if completed:
+                logger.info(f"[User: {user_email}] Successfully streamed response from AI for session {session.id}")
+            elif failed:
+                logger.warning(f"[User: {user_email}] AI stream failed mid-reply, saved partial reply for session {session.id}")
+            else:
+                logger.warning(f"[User: {user_email}] Client disconnected mid-stream, saved partial reply for session {session.id}")
+        except Exception as e:
+            logger.error(f"[User: {user_email}] Error saving streamed reply for session {session.id}: {e}")
+            db.session.rollback()
+
+    payload = {
+        "message": ai_response,
+        "messages": [{"role": m["role"], "content": m["content"]} for m in current_messages]
+    }
+    if failed:
+        payload["error"] = "The response was interrupted before it finished"
+        yield _sse_event("error", payload)
+    else:
+        yield _sse_event("done", payload)
+
+def _enqueue_message_sentiment(session, new_messages, user_email):
+    """
+    Queue scoring of this turn's user message, so sentiment stays off the response path.
+    The job commits with the messages it scores.
+    """
+    if any(message["role"] == "user" for message in new_messages):
+        enqueue_job("score_message_sentiment", {"user_email": user_email, "session_id": session.id}, user_email=user_email)
+
+@register_job("score_message_sentiment")
+def score_message_sentiment_job(payload):
+    try:
+        _score_new_messages(payload["user_email"], payload["session_id"])
+    except LookupError as e:
+        # VADER lexicon not provisioned on this host; a retry won't help
+        logger.error(f"[User: {payload['user_email']}] Sentiment unavailable for session {payload['session_id']}: {e}")
+
 def update_session_summaries(session_id, user_email):
     """Generate summary for a specific session"""
     # Get the specific session
@@ -337,95 +475,242 @@ def update_session_summaries(session_id, user_email):
     ).first()
 
     if session and not session.summary:
-        messages = json.loads(session.messages)
+        messages = session.get_messages()
         session.summary = generateSessionSummary(messages)
         
     return session.summary if session else None
 
-def update_user_summary(user_email):
+@register_job("finalize_sessions")
+def finalize_sessions_job(payload):
     """
-    Update the user's long-term summary after each session.
+    Background work after sessions are ended or archived: sentiment (optional), session summary
+    and embedding for each session, then one user summary update for the whole batch.
+    Each session is committed as soon as it is finalized, and recorded in the payload's finalized_ids
+    in the same commit, so a retry skips it instead of paying to summarize it again. LLM and embedding
+    failures raise, so the job is retried instead of storing a placeholder summary or no embedding.
     """
-    try:
-        # Get all past session summaries
-        all_sessions = ChatSession.query.filter_by(
-            user_email=user_email, is_deleted=False, is_archived=False, is_ended=True
-        ).order_by(ChatSession.timestamp.desc()).all()
-
-        # Create list of session summaries and embeddings dictionary
-        session_summaries = []
-        session_embeddings = {}
-
-        for session in all_sessions:
-            if session.summary:
-                session_summaries.append({
-                    'session_id': session.id,
-                    'summary': session.summary,
-                    'timestamp': session.timestamp.isoformat()
-                })
-                if session.embedding:  # Store embedding if it exists
-                        session_embeddings[str(session.id)] = (
-                            json.loads(session.embedding) if isinstance(session.embedding, str) else session.embedding
-    )
+    user_email = payload["user_email"]
+    finalized_ids = list(payload.get("finalized_ids", []))
+    for session_id in payload.get("session_ids", []):
+        if session_id in finalized_ids:
+            continue
+        session = ChatSession.query.filter_by(id=session_id, user_email=user_email).first()
+        if not session or session.is_deleted:
+            continue
 
-        if session_summaries:
-            # Get existing user summary if it exists
-            user_summary = UserSummary.query.filter_by(user_email=user_email).first()
-            previous_summary = user_summary.summary if user_summary else None
+        if payload.get("sentiment"):
+            try:
+                # Messages are scored as they arrive; this only catches up on any that weren't
+                scored = _score_new_messages(user_email, session_id)
+                logger.info(f"[User: {user_email}] Scored {scored} remaining messages for session {session_id}")
+            except LookupError as e:
+                # VADER lexicon not provisioned on this host; finish the rest of the session
+                logger.error(f"[User: {user_email}] Sentiment unavailable for session {session_id}: {e}")
 
-            # Generate an overall user summary from session summaries
-            new_user_summary = generateUserSummary(
-                [s['summary'] for s in session_summaries],
-                previous_summary=previous_summary
-            )
+        # Generate summary from messages
+        messages = session.get_messages()
+        if messages and (payload.get("regenerate_summary") or not session.summary):
+            session.summary = generateSessionSummary(messages, raise_errors=True)
+            session.embedding = None
+        if session.summary and not session.embedding:
+            session.embedding = encode_embedding(generate_embedding(session.summary, raise_errors=True))
+            session.summary_folded_at = None  # New summary, fold it into the user summary again
+
+        finalized_ids.append(session_id)
+        update_job_payload(finalized_ids=finalized_ids)
+        db.session.commit()
+        sync_session_embedding(session)
+        logger.info(f"[User: {user_email}] Finalized session {session_id}")
 
-            # Update or create user summary in the database
-            if user_summary:
-                user_summary.summary = new_user_summary
-                user_summary.session_summaries = json.dumps(session_summaries)
-                user_summary.session_embeddings = json.dumps(session_embeddings)
-                user_summary.updated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
-            else:
-                new_user_summary_record = UserSummary(
-                    user_email=user_email,
-                    summary=new_user_summary,
-                    session_summaries=json.dumps(session_summaries),
-                    session_embeddings=json.dumps(session_embeddings)
-                )
-                db.session.add(new_user_summary_record)
+    update_user_summary(user_email, raise_errors=True)
 
+@register_job("update_user_summary")
+def update_user_summary_job(payload):
+    update_user_summary(payload["user_email"], raise_errors=True)
+
+def update_user_summary(user_email, raise_errors=False, full=False):
+    """
+    Update the user's long-term summary after sessions end.
+    Only sessions that haven't been folded in yet are sent to the model, with the previous summary,
+    so the prompt stays the same size however long the user's history grows. Everything is rebuilt
+    from all session summaries when full=True, for a user's first summary, and every
+    userSummaryFullRebuildEvery incremental updates.
+    Updates for the same user run one at a time: the summary row is locked until the commit, so a
+    concurrent update waits and then sees the sessions this one folded in. Two first summaries for
+    the same user can't both be inserted (user_email is unique); the losing job fails and retries.
+    Errors are logged, or re-raised with raise_errors=True so a background job can retry.
+    """
+    try:
+        user_summary = UserSummary.query.filter_by(user_email=user_email).with_for_update().first()
+        previous_version = user_summary.updated_at if user_summary else None
+        if (full or not user_summary or
+                (userSummaryFullRebuildEvery and user_summary.incremental_updates >= userSummaryFullRebuildEvery)):
+            updated = _rebuild_user_summary(user_email, user_summary)
+        else:
+            updated = _fold_new_sessions(user_email, user_summary)
+
+        if updated:
             db.session.commit()
 
+            # Cached trimmed summaries were derived from the previous summary
+            invalidate_trimmed_summaries(user_email)
+            # Sessions were synced into the local vector index as they changed; keep it current
+            user_summary = UserSummary.query.filter_by(user_email=user_email).first()
+            stamp_user_index(user_email, previous_version, user_summary.updated_at)
+
     except Exception as e:
         logger.error(f"User Summary Update Error: {e}")
+        db.session.rollback()
+        if raise_errors:
+            raise
+
+def _summarized_session_filters(user_email):
+    """Filters for the sessions that belong in a user summary: ended, kept, and summarized."""
+    return (
+        ChatSession.user_email == user_email,
+        ChatSession.is_deleted == False,
+        ChatSession.is_archived == False,
+        ChatSession.is_ended == True,
+        ChatSession.summary.isnot(None),
+        ChatSession.summary != ""
+    )
+
+def _session_summary_entry(session):
+    return {
+        'session_id': session.id,
+        'summary': session.summary,
+        'timestamp': session.timestamp.isoformat()
+    }
+
+def _mark_sessions_folded(session_ids):
+    if session_ids:
+        ChatSession.query.filter(ChatSession.id.in_(session_ids)).update(
+            {ChatSession.summary_folded_at: datetime.now(timezone.utc)}, synchronize_session=False
+        )
+
+def _rebuild_user_summary(user_email, user_summary):
+    """
+    Full rebuild: regenerate the summary from every session summary and rewrite the stored lists.
+    """
+    # Get all past session summaries
+    all_sessions = ChatSession.query.options(undefer(ChatSession.embedding)).filter(
+        *_summarized_session_filters(user_email)
+    ).order_by(ChatSession.timestamp.desc()).all()
+
+    # Create list of session summaries and embeddings dictionary
+    session_summaries = []
+    embedding_ids = []
+    embedding_rows = []
+
+    for session in all_sessions:
+        session_summaries.append(_session_summary_entry(session))
+        embedding = decode_embedding(session.embedding)
+        if embedding is not None:  # Store embedding if it exists
+            if embedding_rows and embedding.shape[0] != embedding_rows[0].shape[0]:
+                logger.warning(f"[User: {user_email}] Skipping embedding with unexpected dimension for session {session.id}")
+                continue
+            embedding_ids.append(session.id)
+            embedding_rows.append(embedding)
+
+    if not session_summaries:
+        return False
+
+    session_embeddings = encode_embedding_matrix(embedding_ids, embedding_rows)
+    previous_summary = user_summary.summary if user_summary else None
+
+    # Generate an overall user summary from session summaries
+    new_user_summary = generateUserSummary(
+        [s['summary'] for s in session_summaries],
+        previous_summary=previous_summary,
+        raise_errors=True  # On failure keep the stored summary rather than a placeholder
+    )
+
+    # Update or create user summary in the database
+    if not user_summary:
+        user_summary = UserSummary(user_email=user_email)
+        db.session.add(user_summary)
+    user_summary.summary = new_user_summary
+    user_summary.session_summaries = json.dumps(session_summaries)
+    user_summary.session_embeddings = session_embeddings
+    user_summary.incremental_updates = 0
+    user_summary.updated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    _mark_sessions_folded([session.id for session in all_sessions])
+    logger.info(f"[User: {user_email}] Rebuilt user summary from {len(session_summaries)} sessions")
+    return True
+
+def _fold_new_sessions(user_email, user_summary):
+    """
+    Incremental update: fold only new or re-summarized sessions into the existing summary,
+    and patch the stored session lists instead of rebuilding them. Sessions that were archived
+    or deleted since are dropped from the lists; their insights leave the summary text at the
+    next full rebuild.
+    """
+    # Ids only; full rows are loaded just for the sessions being folded in
+    eligible = dict(db.session.query(ChatSession.id, ChatSession.summary_folded_at).filter(
+        *_summarized_session_filters(user_email)
+    ).all())
+
+    stored_summaries = json.loads(user_summary.session_summaries) if user_summary.session_summaries else []
+    stored_ids = {entry['session_id'] for entry in stored_summaries}
+
+    pending_ids = {session_id for session_id, folded_at in eligible.items()
+                   if folded_at is None or session_id not in stored_ids}
+    removed_ids = stored_ids - eligible.keys()
+    if not pending_ids and not removed_ids:
+        return False
+
+    new_sessions = ChatSession.query.options(undefer(ChatSession.embedding)).filter(
+        ChatSession.id.in_(pending_ids)
+    ).order_by(ChatSession.timestamp.desc()).all() if pending_ids else []
+
+    # Patch the summary list, newest first like a full rebuild
+    dropped_ids = pending_ids | removed_ids
+    session_summaries = [entry for entry in stored_summaries if entry['session_id'] not in dropped_ids]
+    session_summaries.extend(_session_summary_entry(session) for session in new_sessions)
+    session_summaries.sort(key=lambda entry: datetime.fromisoformat(entry['timestamp']), reverse=True)
+
+    # Patch the embedding matrix the same way
+    ids, matrix = decode_embedding_matrix(user_summary.session_embeddings)
+    keep = ~np.isin(ids, list(dropped_ids))
+    embedding_ids = list(ids[keep])
+    embedding_rows = list(matrix[keep])
+    for session in new_sessions:
+        embedding = decode_embedding(session.embedding)
+        if embedding is not None:
+            if embedding_rows and embedding.shape[0] != embedding_rows[0].shape[0]:
+                logger.warning(f"[User: {user_email}] Skipping embedding with unexpected dimension for session {session.id}")
+                continue
+            embedding_ids.append(session.id)
+            embedding_rows.append(embedding)
+
+    if new_sessions:
+        # Raises on failure: nothing is written and the sessions stay pending for the next update
+        user_summary.summary = generateUserSummary(
+            [session.summary for session in new_sessions],
+            previous_summary=user_summary.summary,
+            incremental=True,
+            raise_errors=True
+        )
+        user_summary.incremental_updates += 1
+    user_summary.session_summaries = json.dumps(session_summaries)
+    user_summary.session_embeddings = encode_embedding_matrix(embedding_ids, embedding_rows)
+    user_summary.updated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    _mark_sessions_folded(list(pending_ids))
+    logger.info(f"[User: {user_email}] Folded {len(new_sessions)} new sessions into user summary, "
+                f"dropped {len(removed_ids)}")
+    return True
 
 @chat_bp.route('/assistants', methods=['GET'])
 @authenticate
 def get_assistants(user_email):
     """
-    Retrieve all assistants from the database.
+    Retrieve all assistants the user can pick, from the in-process catalog.
+    Supports If-None-Match: returns 304 while the catalog is unchanged.
     """
     try:
-        assistants = Assistant.query.filter(
-            Assistant.is_globally_hidden == False,
-            db.or_( 
-                Assistant.created_by == 'admin',
-                Assistant.created_by == user_email
-            )
-        ).order_by(Assistant.id).all()
-        result = []
-        for assistant in assistants:
-            result.append({
-                "id": assistant.id,
-                "name": assistant.name,
-                "system_prompt": assistant.system_prompt,
-                "created_by": assistant.created_by,
-                "created_at": assistant.created_at.isoformat() if assistant.created_at else None,
-                "avatar_url": assistant.avatar_url,
-                "is_globally_hidden": assistant.is_globally_hidden,
-                "short_desc": assistant.short_desc
-            })
-        return jsonify(result), 200
+        return _catalog_response(assistant_catalog, user_email)
     except Exception as e:
         logger.error(f"Failed to retrieve assistants: {e}")
         return jsonify({"error": "Failed to retrieve assistants"}), 500
@@ -434,136 +719,87 @@ def get_assistants(user_email):
 @authenticate
 def get_goals(user_email):
     """
-    Retrieve all goals from the database.
+    Retrieve all goals the user can pick, from the in-process catalog.
+    Supports If-None-Match: returns 304 while the catalog is unchanged.
     """
     try:
-        goals = Goals.query.filter(
-            Goals.is_globally_hidden == False,
-            db.or_(
-                Goals.created_by == 'admin',
-                Goals.created_by == user_email
-            )
-        ).order_by(Goals.id).all()
-        
-        result = []
-        for goal in goals:
-            result.append({
-                "id": goal.id,
-                "category": goal.category,
-                "name": goal.name,
-                "system_prompt": goal.system_prompt,
-                "created_by": goal.created_by,
-                "created_at": goal.created_at.isoformat() if goal.created_at else None,
-                "avatar_url": goal.avatar_url,
-                "is_globally_hidden": goal.is_globally_hidden,
-                "short_desc": goal.short_desc
-            })
-        return jsonify(result), 200
+        return _catalog_response(goal_catalog, user_email)
     except Exception as e:
         logger.error(f"Failed to retrieve goals: {e}")
         return jsonify({"error": "Failed to retrieve goals"}), 500
 
+def _catalog_response(catalog, user_email):
+    """JSON list of a catalog's visible rows with an ETag; 304 if the client's copy is current."""
+    etag = catalog.etag(user_email)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(catalog.visible_to(user_email))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"  # Browsers revalidate with If-None-Match
+    return response
+
 @chat_bp.route('/sessions/stats', methods=['GET'])
 @authenticate
 def get_session_stats(user_email):
     try:
-        # Get all non-deleted sessions
-        sessions = ChatSession.query.filter_by(
-            user_email=user_email,
-            is_deleted=False
-        ).order_by(ChatSession.timestamp.desc()).all()
-
-        # Initialize contribution data
-        contributions = {}
-        for session in sessions:
-            # Return UTC timestamp for frontend to handle timezone conversion
-            date_str = session.timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-            
-            # Store in contributions using UTC date as key
-            utc_date = session.timestamp.strftime('%Y-%m-%d')
-            year = session.timestamp.year
-            
-            if year not in contributions:
-                contributions[year] = {}
-            
-            if utc_date not in contributions[year]:
-                contributions[year][utc_date] = {
-                    'count': 0,
-                    'timestamps': []
-                }
-            
-            contributions[year][utc_date]['count'] += 1
-            contributions[year][utc_date]['timestamps'].append(date_str)
-
-        # Calculate streaks
-        today = datetime.now(timezone.utc)
-        current_date = today
-        daily_streak = 0
-        weekly_streak = 0
-        monthly_streak = 0
-
-        # Daily streak
-        while True:
-            date_str = current_date.strftime('%Y-%m-%d')
-            year = current_date.year
-            if not contributions.get(year, {}).get(date_str):
-                break
-            daily_streak += 1
-            current_date = current_date - timedelta(days=1)
-
-        # Weekly streak
-        current_date = today
-        current_week = current_date.isocalendar()[1]
-        current_year = current_date.year
-
-        while True:
-            # Check if there's any session in this week
-            has_sessions = False
-            for session in sessions:
-                if (session.timestamp.isocalendar()[1] == current_week and 
-                    session.timestamp.year == current_year):
-                    has_sessions = True
-                    break
-            
-            if not has_sessions:
-                break
-                
-            weekly_streak += 1
-            current_week -= 1
-            if current_week == 0:
-                current_year -= 1
-                current_week = datetime(current_year, 12, 28).isocalendar()[1]
-
-        # Monthly streak
-        current_date = today
-        while True:
-            # Check if there's any session in this month
-            has_sessions = False
-            for session in sessions:
-                if (session.timestamp.month == current_date.month and 
-                    session.timestamp.year == current_date.year):
-                    has_sessions = True
-                    break
-            
-            if not has_sessions:
-                break
-                
-            monthly_streak += 1
-            current_date = current_date.replace(day=1) - timedelta(days=1)  # Go to previous month
+        # Per-day session counts from the rollup, one row per active day
+        daily_counts = dict(UserDailyActivity.query.with_entities(
+            UserDailyActivity.activity_date, UserDailyActivity.session_count
+        ).filter(
+            UserDailyActivity.user_email == user_email,
+            UserDailyActivity.session_count > 0
+        ).all())
 
-        return jsonify({
-            'contributions': contributions,
-            'streaks': {
-                'daily': daily_streak,
-                'weekly': weekly_streak,
-                'monthly': monthly_streak
-            }
-        }), 200
+        return jsonify(_activity_stats(daily_counts, datetime.now(timezone.utc).date())), 200
 
     except Exception as e:
         logger.error(f"[User: {user_email}] Stats Retrieval Error: {e}")
         return jsonify({"error": "Failed to load stats"}), 500
 
+def _activity_stats(daily_counts, today):
+    """
+    Contribution graph and daily/weekly/monthly streaks from {UTC date: session count}.
+    Each streak counts back from the current day, ISO week or month; linear in active days.
+    """
+    # Initialize contribution data, keyed by year then UTC date
+    contributions = {}
+    for day, count in sorted(daily_counts.items()):
+        contributions.setdefault(day.year, {})[day.isoformat()] = {'count': count}
+
+    active_weeks = {day.isocalendar()[:2] for day in daily_counts}
+    active_months = {(day.year, day.month) for day in daily_counts}
+
+    # Daily streak
+    daily_streak = 0
+    current_date = today
+    while current_date in daily_counts:
+        daily_streak += 1
+        current_date -= timedelta(days=1)
+
+    # Weekly streak
+    weekly_streak = 0
+    current_date = today
+    while current_date.isocalendar()[:2] in active_weeks:
+        weekly_streak += 1
+        current_date -= timedelta(days=7)
+
+    # Monthly streak
+    monthly_streak = 0
+    current_date = today
+    while (current_date.year, current_date.month) in active_months:
+        monthly_streak += 1
+        current_date = current_date.replace(day=1) - timedelta(days=1)  # Go to previous month
+
+    return {
+        'contributions': contributions,
+        'streaks': {
+            'daily': daily_streak,
+            'weekly': weekly_streak,
+            'monthly': monthly_streak
+        }
+    }
+
 @chat_bp.route('/session_sentiments/<int:session_id>', methods=['GET'])
 @authenticate
 def get_session_sentiments(user_email, session_id):
@@ -594,44 +830,88 @@ def get_session_sentiments(user_email, session_id):
         return jsonify({"error": "Failed to retrieve session sentiments"}), 500
         
 
+def _score_new_messages(user_email, session_id):
+    """
+    Score the session's user messages that have no sentiment yet and fold them into its running
+    aggregate, so no message is ever rescored. Each message is claimed with a conditional UPDATE,
+    so overlapping runs never count one twice. Returns the number of messages scored. The caller commits.
+    """
+    unscored = ChatMessage.query.with_entities(ChatMessage.id, ChatMessage.content).filter(
+        ChatMessage.session_id == session_id,
+        ChatMessage.role == "user",
+        ChatMessage.sentiment_score.is_(None)
+    ).order_by(ChatMessage.seq).all()
+
+    count = 0
+    total = 0.0
+    for message_id, content in unscored:
+        score = analyze_sentiment(content)['sentiment_score']
+        claimed = db.session.execute(
+            update(ChatMessage)
+            .where(ChatMessage.id == message_id, ChatMessage.sentiment_score.is_(None))
+            .values(sentiment_score=score)
+            .returning(ChatMessage.id),
+            execution_options={"synchronize_session": False}
+        ).first()
+        if claimed:
+            count += 1
+            total += score
+
+    SessionSentiments.add_message_scores(user_email, session_id, count, total)
+    return count
+
 def _generate_session_sentiment(user_email, session_id):
     """
-    Helper function to generate and store sentiment analysis for a chat session.
-    Only analyzes user messages, ignoring system and assistant messages.
+    Helper function to bring a chat session's sentiment up to date and return its record.
+    Only analyzes user messages, ignoring system and assistant messages; messages already
+    scored are not scored again.
     """
     # Verify the session belongs to the user
     session = ChatSession.query.filter_by(id=session_id, user_email=user_email).first()
     if not session:
         raise ValueError("Session not found or unauthorized")
 
-    # Get messages from session
-    messages = json.loads(session.messages)
-    if not messages:
-        raise ValueError("No messages found in session")
+    _score_new_messages(user_email, session_id)
+    db.session.commit()
 
-    # Extract only user messages
-    user_messages = [msg.get('content', '') for msg in messages if msg.get('role') == 'user']
-    if not user_messages:
+    sentiment = SessionSentiments.query.filter_by(session_id=session_id).first()
+    if not sentiment:
         raise ValueError("No user messages found in session")
+    return sentiment
 
-    # Combine user messages and analyze sentiment
-    message_text = " ".join(user_messages)
-    sentiment_scores = analyze_sentiment(message_text)
-    
-    # Create new sentiment record
-    sentiment = SessionSentiments(
-        user_email=user_email,
-        session_id=session_id,
-        sentiment=sentiment_scores['sentiment'],
-        sentiment_score=sentiment_scores['sentiment_score'],
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc)
-    )
+@chat_bp.route('/session_sentiments/<int:session_id>/messages', methods=['GET'])
+@authenticate
+def get_session_message_sentiments(user_email, session_id):
+    """
+    Per-message sentiment of a session's user messages, in order: the session's mood curve.
+    Messages not scored yet are left out.
+    """
+    try:
+        session = ChatSession.query.filter_by(id=session_id, user_email=user_email).first()
+        if not session:
+            return jsonify({"error": "Session not found or unauthorized"}), 404
 
-    db.session.add(sentiment)
-    db.session.commit()
-    
-    return sentiment
+        rows = ChatMessage.query.with_entities(
+            ChatMessage.seq, ChatMessage.sentiment_score, ChatMessage.created_at
+        ).filter(
+            ChatMessage.session_id == session_id,
+            ChatMessage.role == "user",
+            ChatMessage.sentiment_score.isnot(None)
+        ).order_by(ChatMessage.seq).all()
+
+        return jsonify([
+            {
+                'seq': seq,
+                'sentiment': sentiment_label(score),
+                'sentiment_score': score,
+                'created_at': created_at.isoformat() if created_at else None
+            }
+            for seq, score, created_at in rows
+        ]), 200
+
+    except Exception as e:
+        logger.error(f"[User: {user_email}] Message Sentiments Retrieval Error: {e}")
+        return jsonify({"error": "Failed to retrieve message sentiments"}), 500
 
 @chat_bp.route('/session_sentiments/<int:session_id>', methods=['POST'])
 @authenticate
@@ -653,36 +933,82 @@ def generate_session_sentiment(user_email, session_id):
 @authenticate
 def get_user_sentiments(user_email):
     """
-    Retrieve all sentiment data for a user.
+    Retrieve sentiment data for a user, latest session first, in one projected query.
+    ?start=<ISO date or datetime> (inclusive) and ?end= (exclusive) limit the session dates (UTC if no offset).
+    Pass ?limit=N to page; the response is then {"sentiments", "has_more", "next_cursor"},
+    and ?cursor=<next_cursor> gets the next page.
     """
     try:
-        # Get all sentiment records for the user with their associated session timestamps
-        sentiments = SessionSentiments.query\
-            .join(ChatSession, SessionSentiments.session_id == ChatSession.id)\
-            .filter(
-                SessionSentiments.user_email == user_email,
-                ChatSession.is_deleted == False,
-                ChatSession.is_archived == False
-            )\
-            .order_by(ChatSession.timestamp.desc())\
-            .all()  # Get latest first
-
-        print(f"Found {len(sentiments)} sentiment records for user {user_email}")  # Debug log
+        try:
+            start = _parse_utc_datetime(request.args.get("start"))
+            end = _parse_utc_datetime(request.args.get("end"))
+        except ValueError:
+            return jsonify({"error": "start and end must be ISO 8601 dates or datetimes"}), 400
 
-        result = []
-        for sentiment in sentiments:
-            # Get the associated chat session
-            session = ChatSession.query.get(sentiment.session_id)
-            result.append({
-                'created_at': session.timestamp.isoformat(),  # Use session timestamp instead
-                'sentiment_score': sentiment.sentiment_score,
-                'sentiment': sentiment.sentiment,
-                'session_id': sentiment.session_id
-            })
+        limit = request.args.get("limit", type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "limit must be positive"}), 400
 
-        return jsonify(result), 200
+        cursor = request.args.get("cursor")
+        try:
+            cursor = decode_list_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        # Only the four values MoodTracker plots, with the session timestamp from the join
+        query = db.session.query(
+            SessionSentiments.id,
+            SessionSentiments.session_id,
+            SessionSentiments.sentiment,
+            SessionSentiments.sentiment_score,
+            ChatSession.timestamp
+        ).join(ChatSession, SessionSentiments.session_id == ChatSession.id).filter(
+            SessionSentiments.user_email == user_email,
+            ChatSession.is_deleted == False,
+            ChatSession.is_archived == False
+        )
+        if start is not None:
+            query = query.filter(ChatSession.timestamp >= start)
+        if end is not None:
+            query = query.filter(ChatSession.timestamp < end)
+        if cursor is not None:
+            query = query.filter(tuple_(ChatSession.timestamp, SessionSentiments.id) < cursor)
+        query = query.order_by(ChatSession.timestamp.desc(), SessionSentiments.id.desc())  # Get latest first
+
+        next_cursor = None
+        if limit is None:
+            rows = query.all()
+        else:
+            rows = query.limit(limit + 1).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_list_cursor(rows[-1].timestamp, rows[-1].id)
+
+        result = [{
+            'created_at': row.timestamp.isoformat(),  # Use session timestamp instead
+            'sentiment_score': row.sentiment_score,
+            'sentiment': row.sentiment,
+            'session_id': row.session_id
+        } for row in rows]
+
+        if limit is None:
+            return jsonify(result), 200
+        return jsonify({
+            "sentiments": result,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
+        }), 200
 
     except Exception as e:
         logger.error(f"[User: {user_email}] User Sentiments Retrieval Error: {e}")
         return jsonify({"error": "Failed to retrieve user sentiments"}), 500
 
+def _parse_utc_datetime(value):
+    """Parse an ISO 8601 date or datetime query parameter; naive values are taken as UTC."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
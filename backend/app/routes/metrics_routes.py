@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, request
+from app.utils.metrics import get_metrics
+import hmac
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# /metrics is only registered when enabled, and then requires the X-Metrics-Token header if METRICS_TOKEN is set
+metrics_enabled = str(os.getenv("METRICS_ENABLED", "false")).lower() == "true"
+metricsToken = os.getenv("METRICS_TOKEN", "")
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='')
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_process_metrics():
+    """
+    Report in-process counters (cache hit/miss rates etc.) for this worker.
+    """
+    if metricsToken and not hmac.compare_digest(request.headers.get("X-Metrics-Token", ""), metricsToken):
+        return jsonify({"error": "Invalid metrics token"}), 401
+    try:
+        return jsonify(get_metrics()), 200
+    except Exception as e:
+        logger.error(f"Metrics Retrieval Error: {e}")
+        return jsonify({"error": "Failed to load metrics"}), 500
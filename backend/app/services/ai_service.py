@@ -1,38 +1,103 @@
-import openai
 import os
 from app.models.chat_session import ChatSession
 from app.models.user_summary import UserSummary
+from app.models.embedding_cache import EmbeddingCache
+from app.models.session_sentiments import sentiment_label
+from app.services.vector_index import search_user_sessions
+from app.services import token_budget
+from app.services.openai_client import client as openai_client, contextTimeout, contextMaxRetries, summaryTimeout
+from app.services.token_budget import fit_to_budget, contextTokenBudget
+from app.services.job_queue import register_maintenance
+from app.__init__ import db
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import json
-from datetime import datetime, timezone
-from config import Config
-from flask import request
-import numpy as np
-from tiktoken import encoding_for_model
-from sklearn.metrics.pairwise import cosine_similarity
+from datetime import datetime, timezone, timedelta
 import numpy as np
 import logging
-import openai
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from app.utils.cache import LRUCache
+from app.utils.metrics import Counters
+from app.utils.embeddings import encode_embedding, decode_embedding, decode_embedding_matrix
+import struct
+import hashlib
+import re
+from collections import Counter
 
 # Add debug flag from environment
 debug_mode = str(os.getenv("DEBUG_MODE", "false")).lower() == "true"
 
 logger = logging.getLogger(__name__)
 
-client = openai
-client.api_key = Config.OPENAI_API_KEY
+# Shared per-process client: pooled connections, timeouts, retries and a circuit breaker
+client = openai_client
 model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 secondary_model = os.getenv("OPENAI_MODEL_SECONDARY", "gpt-4o-mini")
 
-nltk.download('vader_lexicon')
-sia = SentimentIntensityAnalyzer()
+# VADER sentiment analyzer, built on first use: importing nltk takes over a second, and the lexicon
+# is read from disk, never downloaded. Provision it at build time (nltk.txt lists it for the buildpack,
+# or run `python -m nltk.downloader vader_lexicon`); NLTK_DATA or VADER_LEXICON_PATH point at it.
+vaderLexiconPath = os.getenv("VADER_LEXICON_PATH")  # Optional path to vader_lexicon.txt
+_sentiment_analyzer = None
+_sentiment_analyzer_lock = threading.Lock()
 
 logger.info(f"Using OpenAI model: {model}")
 sessionSummaryMaxTokens = 2048
 userSummaryMaxTokens = 2048
 responseMaxTokens = 1024
 
+# Extra vector index hits fetched beyond max_n, in case some are dropped as deleted, archived or not the user's
+indexSearchHeadroom = int(os.getenv("VECTOR_INDEX_SEARCH_HEADROOM", "5"))
+
+# Context enrichment stages (recent session, trimmed summary, past insights) run concurrently
+contextFanoutEnabled = str(os.getenv("CONTEXT_FANOUT", "true")).lower() == "true"
+contextStageTimeout = float(os.getenv("CONTEXT_STAGE_TIMEOUT", "8"))  # Seconds per stage
+if contextTimeout * (1 + contextMaxRetries) > contextStageTimeout:
+    logger.warning(f"OPENAI_TIMEOUT_CONTEXT={contextTimeout}s with {contextMaxRetries} retries outlasts "
+                   f"CONTEXT_STAGE_TIMEOUT={contextStageTimeout}s; timed-out stages will keep their requests running")
+context_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CONTEXT_FANOUT_WORKERS", "16")),
+    thread_name_prefix="context-stage"
+)
+
+# Assembled system prompts, keyed by (assistant_id, frozenset(goal_ids), assistant catalog version, goal catalog version)
+system_prompt_cache = LRUCache("system_prompt", maxsize=int(os.getenv("SYSTEM_PROMPT_CACHE_SIZE", "512")))
+system_prompt_stats = Counters("system_prompt", "reused", "built")
+
+# Trimmed user summaries, keyed by (user_email, summary version, topic signature of the latest message)
+trimmed_summary_cache = LRUCache("trimmed_summary", maxsize=int(os.getenv("TRIMMED_SUMMARY_CACHE_SIZE", "2048")))
+# Embeddings, keyed by (embedding model, sha256 of the text); backed by the embedding_cache table.
+# Entries are read-only float32 arrays, about 6KB each at 1536 dimensions.
+embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+embedding_cache = LRUCache("embedding", maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")))
+embeddingCacheRetentionDays = int(os.getenv("EMBEDDING_CACHE_RETENTION_DAYS", "30"))  # Table rows older than this are pruned; 0 keeps them
+embedding_stats = Counters("embedding_cache.tiers", "memory_hits", "db_hits", "api_calls", "batched_inputs")
+# Bulk embedding requests (generate_embeddings): inputs and tokens per request, under the API's 2048 / 300k limits
+embeddingBatchMaxInputs = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "512"))
+embeddingBatchMaxTokens = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+
+# User summary updates: full rebuilds send every session summary, incremental ones only the new sessions
+user_summary_stats = Counters(
+    "user_summary",
+    "full_updates", "full_sessions", "full_prompt_tokens", "full_completion_tokens",
+    "incremental_updates", "incremental_sessions", "incremental_prompt_tokens", "incremental_completion_tokens"
+)
+
+# Decoded session embedding matrices, keyed by (user_email, UserSummary.updated_at)
+session_matrix_cache = LRUCache("session_matrix", maxsize=int(os.getenv("SESSION_MATRIX_CACHE_SIZE", "256")))
+
+topicSignatureTerms = int(os.getenv("TOPIC_SIGNATURE_TERMS", "3"))
+
+TOPIC_STOPWORDS = frozenset("""
+about after again also always because been before being could didn does doing done down even every feel
+feeling felt from going good have having here just know like little make maybe more much need never only
+other really right said should since some still such than that their them then there these they thing
+things think this those through today very want well were what when where which while will with would
+your yours yourself
+""".split())
+
 def generate_ai_response(messages, user_email, assistant_id=None, goal_ids=None):
     """
     Generate an AI response using session summaries instead of full chat logs.
@@ -67,122 +132,284 @@ def generate_ai_response(messages, user_email, assistant_id=None, goal_ids=None)
         logger.error(f"[User: {user_email}] Error generating AI response: {str(e)}")
         return "I'm having trouble generating a response right now."
 
+def stream_ai_response(messages, user_email, assistant_id=None, goal_ids=None):
+    """
+    Stream an AI response, yielding content deltas as soon as OpenAI sends them.
+    A failure before the first delta yields a fallback message; once deltas have been sent it is re-raised,
+    so the caller knows the reply is truncated.
+    """
+    stream = None
+    produced = False
+    try:
+        logger.info(f"[User: {user_email}] Streaming AI response with context management.")
+
+        full_context = createContext(messages, user_email, assistant_id, goal_ids)
+
+        stream = client.chat.completions.create(
+            model=model,
+            messages=full_context,
+            max_completion_tokens=responseMaxTokens,
+            stream=True,
+            stream_options={"include_usage": True}  # Final chunk carries usage stats
+        )
+
+        for chunk in stream:
+            if chunk.usage:
+                logger.info(f"OpenAI API Usage Stats (Main AI Response, streamed): {chunk.usage}")
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                produced = True
+                yield delta
+
+    except Exception as e:
+        logger.error(f"[User: {user_email}] Error streaming AI response: {str(e)}")
+        if produced:
+            raise
+        yield "I'm having trouble generating a response right now."
+
+    finally:
+        # Release the upstream connection if the client went away mid-stream
+        if stream is not None:
+            stream.close()
+
 def createContext(messages, user_email, assistant_id, goal_ids):
     """
     Builds the full context for an AI response, including relevant past session summaries and user history.
+    The enrichment stages don't depend on each other, so they run concurrently and a slow stage is dropped
+    after contextStageTimeout seconds instead of holding up the response.
     """
     if not messages:
         latest_message = "User has started a new session."
-        # Get recent session context for first message
-        recent_context = get_most_recent_session_context(user_email)
     else:
         latest_message = messages[-1]['content']
-        recent_context = None
 
     # Step 1: Fetch relevant past sessions
     user_summary = UserSummary.query.filter_by(user_email=user_email).first()
 
-    # Step 2: Get the updated system prompt
+    # Step 2: Start the enrichment stages (stage name -> (function, args, fallback on timeout/error))
+    stages = {}
+    if not messages:
+        # Get recent session context for first message
+        stages["recent_context"] = (get_most_recent_session_context, (user_email,), None)
+    if user_summary and user_summary.summary:
+        stages["trimmed_summary"] = (trim_user_summary, (user_summary.summary, latest_message, user_email), user_summary.summary)
+    stages["relevant_insights"] = (inject_relevant_past_insights, (user_email, latest_message), "")
+
+    pending_stages = start_context_stages(stages)
+
+    # Step 3: Get the updated system prompt while the stages run
     system_prompt = getSystemPrompt(assistant_id, goal_ids, user_email)
 
+    stage_results = collect_context_stages(pending_stages, user_email)
+    recent_context = stage_results.get("recent_context")
+    trimmed_summary = stage_results.get("trimmed_summary")
+    relevant_insights = stage_results.get("relevant_insights")
+
     # Step 5: Organize context structure
     system_messages = [{"role": "system", "content": system_prompt}]
+    optional_sections = []
 
-    current_session_messages = []
-    past_summaries = []
-    user_summary_messages = []
-
-    # Step 6: Include recent user-assistant exchanges (current session)
-    for msg in messages:
-        current_session_messages.append({"role": msg["role"], "content": msg["content"]})
-
-    # Step 7: Add user summary if available
-    if user_summary and user_summary.summary:
-        trimmed_summary = trim_user_summary(user_summary.summary, latest_message)
+    # Step 6: Add user summary if available
+    if trimmed_summary:
         user_summary_content = f"USER SUMMARY:\n{trimmed_summary}\n"
-        user_summary_messages.append({"role": "system", "content": user_summary_content})
+        optional_sections.append(("user_summary", {"role": "system", "content": user_summary_content}))
 
-    # Step 8: Add recent session context for first message
+    # Step 7: Add recent session context for first message
     if recent_context:
-        past_summaries.append({
+        optional_sections.append(("recent_context", {
             "role": "system", 
             "content": f"MOST RECENT SESSION CONTEXT:\n{recent_context}"
-        })
+        }))
 
-    # Step 9: Inject relevant past insights if they apply
-    relevant_insights = inject_relevant_past_insights(user_email, latest_message)
+    # Step 8: Inject relevant past insights if they apply
     if relevant_insights:
-        past_summaries.append({"role": "system", "content": f"**Relevant Past Session Insights:** {relevant_insights}"})
-
-    # Step 10: Assemble full context
-    messages_list = system_messages + user_summary_messages + past_summaries + current_session_messages
+        optional_sections.append(("relevant_insights", {"role": "system", "content": f"**Relevant Past Session Insights:** {relevant_insights}"}))
 
-    if not current_session_messages and not user_summary_messages:
+    closing_messages = []
+    if not messages and not trimmed_summary:
         if recent_context:
-            messages_list.append({
+            closing_messages.append({
                 "role": "system", 
                 "content": "This is a new session, but you have met them before. Consider the recent context above when greeting them."
             })
         else:
-            messages_list.append({
+            closing_messages.append({
                 "role": "system", 
                 "content": "This is your first ever session with them. You haven't met them before. Say hello!"
             })
-    elif not current_session_messages:
-        messages_list.append({"role": "system", "content": "This is a new session. Say hello!"})
+    elif not messages:
+        closing_messages.append({"role": "system", "content": "This is a new session. Say hello!"})
+
+    # Step 9: Fit everything into the token budget (system prompt and latest turn always stay)
+    kept_sections, kept_history, used_tokens = fit_to_budget(
+        system_messages + closing_messages, optional_sections, messages, model
+    )
+    logger.info(f"[User: {user_email}] Context uses {used_tokens}/{contextTokenBudget} tokens, "
+                f"{len(kept_history)}/{len(messages)} session messages.")
+
+    # Step 10: Assemble full context (role and content only)
+    context_messages = (
+        system_messages
+        + [message for name, message in optional_sections if name in kept_sections]
+        + kept_history
+        + closing_messages
+    )
+    messages_list = [{"role": msg["role"], "content": msg["content"]} for msg in context_messages]
 
     return messages_list
 
-def getSystemPrompt(assistant_id, goal_ids, user_email):
+def _run_with_app_context(app, func, args):
+    """Run a context stage on a worker thread with its own app context (and DB session)."""
+    with app.app_context():
+        return func(*args)
+
+def start_context_stages(stages):
     """
-    Generates the system prompt, incorporating user goals, past insights, and follow-up instructions.
+    Submit context enrichment stages to the shared executor.
+    Returns a dict of stage name -> (future, fallback, started_at). With CONTEXT_FANOUT disabled the
+    stages run inline, one after another, and come back as already-completed futures.
     """
-    try:
-        system_prompt = "You are an AI coach helping the user with their goals."
-
-        # Add assistant-specific system prompt if available
-        if assistant_id:
-            try:
-                from app.models.assistant import Assistant
-                assistant = Assistant.query.get(assistant_id)
-                if assistant and assistant.system_prompt:
-                    logger.info(f"Using custom assistant prompt for assistant_id: {assistant_id}")
-                    system_prompt += f"\nYour name is {assistant.name}, and your personality is: {assistant.system_prompt}"
-                else:
-                    logger.warning(f"No assistant system prompt found for assistant_id: {assistant_id}")
-            except Exception as e:
-                logger.error(f"Error retrieving assistant system prompt for assistant_id {assistant_id}: {str(e)}")
-
-        # Add user goals
-        if goal_ids:
+    pending = {}
+    app = current_app._get_current_object()
+    for name, (func, args, fallback) in stages.items():
+        started_at = time.monotonic()
+        if contextFanoutEnabled:
+            future = context_executor.submit(_run_with_app_context, app, func, args)
+        else:
+            future = Future()
             try:
-                from app.models.goals import Goals
-                goals = Goals.query.filter(Goals.id.in_(goal_ids)).all()
-                if goals:
-                    logger.info(f"Adding goals context for goal_ids: {goal_ids}")
-                    system_prompt += "\n\nThe user has selected the following goals:\n"
-                    for goal in goals:
-                        system_prompt += f"- {goal.name}: {goal.system_prompt}\n"
+                future.set_result(func(*args))
             except Exception as e:
-                logger.error(f"Error retrieving goals for goal_ids {goal_ids}: {str(e)}")
+                future.set_exception(e)
+        pending[name] = (future, fallback, started_at)
+    return pending
 
-        # Add follow-up instructions
-        system_prompt += (
-            "\n\nYou must recall key insights from previous sessions to maintain an evolving conversation. "
-            "Ensure you follow up on recurring themes and past discussions naturally, without forcing repetition."
-        )
+def collect_context_stages(pending, user_email):
+    """
+    Wait for each stage up to contextStageTimeout seconds from when it started.
+    A stage that times out or fails is replaced by its fallback value.
+    """
+    results = {}
+    for name, (future, fallback, started_at) in pending.items():
+        remaining = max(0.0, contextStageTimeout - (time.monotonic() - started_at))
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.warning(f"[User: {user_email}] Context stage '{name}' timed out after {contextStageTimeout}s, continuing without it.")
+            results[name] = fallback
+        except Exception as e:
+            logger.error(f"[User: {user_email}] Context stage '{name}' failed: {str(e)}")
+            results[name] = fallback
+    return results
 
+def getSystemPrompt(assistant_id, goal_ids, user_email):
+    """
+    Generates the system prompt, incorporating user goals, past insights, and follow-up instructions.
+    Memoized per (assistant_id, goal set) and catalog versions, so the same selection always gets
+    the exact same string back and the provider's prompt caching can match the prefix.
+    """
+    try:
+        from app.services.catalog import assistant_catalog, goal_catalog
+        key = (assistant_id, frozenset(goal_ids or ()), assistant_catalog.version(), goal_catalog.version())
+        system_prompt = system_prompt_cache.get(key)
+        if system_prompt is not None:
+            system_prompt_stats.incr("reused")
+            return system_prompt
+
+        system_prompt, complete = build_system_prompt(assistant_id, goal_ids)
+        system_prompt_stats.incr("built")
+        if complete:  # Don't pin a prompt that's missing parts because of a lookup error
+            system_prompt_cache.set(key, system_prompt)
         return system_prompt
 
     except Exception as e:
         logger.error(f"Error in getSystemPrompt: {str(e)}")
         return "You are an AI assistant helping users explore their thoughts and feelings."
 
-def trim_user_summary(user_summary, latest_message):
+def build_system_prompt(assistant_id, goal_ids):
+    """
+    Assemble the system prompt from the assistant and goal catalogs. Goals are listed in id order,
+    so the output depends only on the assistant and the set of goals.
+    Returns (prompt, complete); complete is False if a lookup failed and a part was left out.
+    """
+    from app.services.catalog import assistant_catalog, goal_catalog
+    complete = True
+    system_prompt = "You are an AI coach helping the user with their goals."
+
+    # Add assistant-specific system prompt if available (catalogs are cached in-process)
+    if assistant_id:
+        try:
+            assistant = assistant_catalog.get(assistant_id)
+            if assistant and assistant["system_prompt"]:
+                logger.info(f"Using custom assistant prompt for assistant_id: {assistant_id}")
+                system_prompt += f"\nYour name is {assistant['name']}, and your personality is: {assistant['system_prompt']}"
+            else:
+                logger.warning(f"No assistant system prompt found for assistant_id: {assistant_id}")
+        except Exception as e:
+            complete = False
+            logger.error(f"Error retrieving assistant system prompt for assistant_id {assistant_id}: {str(e)}")
+
+    # Add user goals
+    if goal_ids:
+        try:
+            all_goals = goal_catalog.all()
+            goals = [all_goals[goal_id] for goal_id in sorted(set(goal_ids)) if goal_id in all_goals]
+            if goals:
+                logger.info(f"Adding goals context for goal_ids: {goal_ids}")
+                system_prompt += "\n\nThe user has selected the following goals:\n"
+                for goal in goals:
+                    system_prompt += f"- {goal['name']}: {goal['system_prompt']}\n"
+        except Exception as e:
+            complete = False
+            logger.error(f"Error retrieving goals for goal_ids {goal_ids}: {str(e)}")
+
+    # Add follow-up instructions
+    system_prompt += (
+        "\n\nYou must recall key insights from previous sessions to maintain an evolving conversation. "
+        "Ensure you follow up on recurring themes and past discussions naturally, without forcing repetition."
+    )
+
+    return system_prompt, complete
+
+def summary_version(user_summary):
+    """
+    Short content hash of a user summary. Changes whenever update_user_summary rewrites it.
+    """
+    return hashlib.sha1(user_summary.encode("utf-8")).hexdigest()[:16]
+
+def topic_signature(text):
+    """
+    Coarse topic signature of a message: its most frequent meaningful words, sorted.
+    Messages about the same thing map to the same signature so they can share a trimmed summary.
+    """
+    words = [w for w in re.findall(r"[a-z]+", text.lower()) if len(w) >= 4 and w not in TOPIC_STOPWORDS]
+    top_words = sorted(Counter(words).items(), key=lambda item: (-item[1], item[0]))[:topicSignatureTerms]
+    return "|".join(sorted(word for word, _ in top_words))
+
+def invalidate_trimmed_summaries(user_email):
+    """
+    Drop every cached trimmed summary for a user. Called when their user summary is regenerated.
+    """
+    removed = trimmed_summary_cache.discard_where(lambda key: key[0] == user_email)
+    if removed:
+        logger.info(f"[User: {user_email}] Invalidated {removed} cached trimmed summaries.")
+
+def trim_user_summary(user_summary, latest_message, user_email=None):
     """
     Trims the user summary to retain only the most relevant themes based on the latest conversation topic.
     Removes details that are less relevant to the user's current focus.
+    When user_email is given, the result is cached per summary version and topic signature.
     """
+    cache_key = None
+    if user_email:
+        cache_key = (user_email, summary_version(user_summary), topic_signature(latest_message))
+        cached_summary = trimmed_summary_cache.get(cache_key)
+        if cached_summary is not None:
+            logger.info(f"[User: {user_email}] Using cached trimmed summary for topic '{cache_key[2]}'.")
+            return cached_summary
+
     try:
         prompt = (
             "You are helping an AI coach respond to its user. Here is an overall summary of the user's history. "
@@ -195,12 +422,17 @@ def trim_user_summary(user_summary, latest_message):
         response = client.chat.completions.create(
             model=secondary_model,
             messages=[{"role": "system", "content": prompt}],
-            max_tokens=300  # Limit to a smaller summary
+            max_tokens=300,  # Limit to a smaller summary
+            timeout=contextTimeout,
+            max_retries=contextMaxRetries
         )
 
         logger.info(f"OpenAI API Usage Stats (Trim User Summary): {response.usage}")
 
-        return response.choices[0].message.content.strip()
+        trimmed_summary = response.choices[0].message.content.strip()
+        if cache_key:
+            trimmed_summary_cache.set(cache_key, trimmed_summary)
+        return trimmed_summary
 
     except Exception as e:
         logger.error(f"Error trimming user summary: {str(e)}")
@@ -234,7 +466,9 @@ def inject_relevant_past_insights(user_email, latest_message):
         response = client.chat.completions.create(
             model=secondary_model,
             messages=[{"role": "system", "content": prompt}],
-            max_tokens=150  # Limit insights to 1-2 takeaways
+            max_tokens=150,  # Limit insights to 1-2 takeaways
+            timeout=contextTimeout,
+            max_retries=contextMaxRetries
         )
 
         logger.info(f"OpenAI API Usage Stats (Past Session Insights): {response.usage}")
@@ -250,16 +484,16 @@ def count_tokens(text, model="gpt-4o-mini"):
     Count the number of tokens in a given text.
     """
     try:
-        encoding = encoding_for_model(model)
-        return len(encoding.encode(text))
+        return token_budget.count_tokens(text, model)
     except Exception as e:
         logger.error(f"Token counting error: {e}")
         return 0
     
-def generateSessionSummary(messages):
+def generateSessionSummary(messages, raise_errors=False):
     """
     Generate a structured session summary including key themes, emotions, challenges,
     insights, key personal details, and actionable next steps.
+    Failures return a placeholder, or raise with raise_errors=True so a background job can retry.
     """
     try:
         system_prompt = (
@@ -288,7 +522,8 @@ def generateSessionSummary(messages):
         summary_response = client.chat.completions.create(
             model=secondary_model,
             messages=formatted_messages,
-            max_tokens=sessionSummaryMaxTokens
+            max_tokens=sessionSummaryMaxTokens,
+            timeout=summaryTimeout
         )
 
         logger.info(f"OpenAI API Usage Stats (Session Summary): {summary_response.usage}")
@@ -297,31 +532,183 @@ def generateSessionSummary(messages):
 
         if not summary:
             logger.warning("Generated summary is empty.")
+            if raise_errors:
+                raise ValueError("Generated summary is empty")
             return "Summary unavailable. Try refining the session details."
 
         return summary
 
     except Exception as e:
         logger.error(f"Session Summary Generation Error: {e}")
+        if raise_errors:
+            raise
         return "An error occurred while generating the summary."
 
-def generate_embedding(text):
+def _embedding_array(values):
+    """Embeddings are handed out as read-only float32 arrays, so a caller can't change a cached one."""
+    embedding = np.asarray(values, dtype=np.float32)
+    embedding.flags.writeable = False
+    return embedding
+
+def generate_embedding(text, raise_errors=False):
     """
-    Generate an embedding for a given text using OpenAI.
+    Generate an embedding for a given text using OpenAI, as a read-only float32 array.
+    Repeat texts are served from the in-process LRU, then the embedding_cache table, before calling the API.
+    Returns None if the API call fails, or raises with raise_errors=True.
     """
+    text_hash = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+    cache_key = (embedding_model, text_hash)
+
+    cached_embedding = embedding_cache.get(cache_key)
+    if cached_embedding is not None:
+        embedding_stats.incr("memory_hits")
+        return cached_embedding
+
     try:
-        response = openai.embeddings.create(
-            model="text-embedding-3-small", 
+        stored = db.session.get(EmbeddingCache, cache_key)
+        if stored:
+            embedding = decode_embedding(stored.embedding)
+            embedding_cache.set(cache_key, embedding)
+            embedding_stats.incr("db_hits")
+            return embedding
+    except Exception as e:
+        logger.warning(f"Embedding cache lookup failed, falling back to the API: {e}")
+
+    try:
+        response = client.embeddings.create(
+            model=embedding_model, 
             input=text
         )
-        return response.data[0].embedding  # Extract the embedding vector
+        embedding_stats.incr("api_calls")
+        embedding = _embedding_array(response.data[0].embedding)  # Extract the embedding vector
     except Exception as e:
         logger.error(f"Error generating embedding: {e}")
+        if raise_errors:
+            raise
         return None
 
-def generateUserSummary(session_summaries, previous_summary=None):
+    embedding_cache.set(cache_key, embedding)
+    store_cached_embedding(text_hash, embedding)
+    return embedding
+
+def generate_embeddings(texts):
+    """
+    Generate embeddings for many texts, in the same order, as read-only float32 arrays;
+    None for empty texts or failed batches.
+    Cached texts are served from the LRU and one embedding_cache query; the rest are sent many per request,
+    up to EMBEDDING_BATCH_MAX_INPUTS inputs and EMBEDDING_BATCH_MAX_TOKENS tokens.
+    """
+    embeddings = [None] * len(texts)
+    pending = {}  # text_hash -> (text, [positions])
+    for position, text in enumerate(texts):
+        if not text:
+            continue
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        cached_embedding = embedding_cache.get((embedding_model, text_hash))
+        if cached_embedding is not None:
+            embedding_stats.incr("memory_hits")
+            embeddings[position] = cached_embedding
+            continue
+        pending.setdefault(text_hash, (text, []))[1].append(position)
+
+    if pending:
+        try:
+            stored_rows = EmbeddingCache.query.filter(
+                EmbeddingCache.model == embedding_model,
+                EmbeddingCache.text_hash.in_(list(pending))
+            ).all()
+            for stored in stored_rows:
+                embedding = decode_embedding(stored.embedding)
+                embedding_cache.set((embedding_model, stored.text_hash), embedding)
+                embedding_stats.incr("db_hits")
+                for position in pending.pop(stored.text_hash)[1]:
+                    embeddings[position] = embedding
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, falling back to the API: {e}")
+
+    # Pack the remaining texts into requests under the input and token caps
+    batches = []
+    batch, batch_tokens = [], 0
+    for text_hash, (text, _) in pending.items():
+        text_tokens = token_budget.count_tokens(text, embedding_model)
+        if batch and (len(batch) >= embeddingBatchMaxInputs or batch_tokens + text_tokens > embeddingBatchMaxTokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text_hash)
+        batch_tokens += text_tokens
+    if batch:
+        batches.append(batch)
+
+    for batch in batches:
+        try:
+            response = client.embeddings.create(
+                model=embedding_model,
+                input=[pending[text_hash][0] for text_hash in batch]
+            )
+            embedding_stats.incr("api_calls")
+            embedding_stats.incr("batched_inputs", len(batch))
+        except Exception as e:
+            logger.error(f"Error generating embeddings for a batch of {len(batch)} texts: {e}")
+            continue
+
+        generated = []
+        for item in response.data:  # Ordered by item.index, matching the input order
+            text_hash = batch[item.index]
+            embedding = _embedding_array(item.embedding)
+            embedding_cache.set((embedding_model, text_hash), embedding)
+            generated.append((text_hash, embedding))
+            for position in pending[text_hash][1]:
+                embeddings[position] = embedding
+        store_cached_embeddings(generated)
+
+    return embeddings
+
+def store_cached_embedding(text_hash, embedding):
+    store_cached_embeddings([(text_hash, embedding)])
+
+def store_cached_embeddings(entries):
+    """
+    Persist (text_hash, embedding) pairs to the embedding_cache table on its own connection,
+    so the caller's pending session changes are not committed along with them.
+    """
+    if not entries:
+        return
+    try:
+        now = datetime.now(timezone.utc)
+        statement = pg_insert(EmbeddingCache.__table__).values([
+            {
+                "model": embedding_model,
+                "text_hash": text_hash,
+                "embedding": encode_embedding(embedding),
+                "created_at": now
+            }
+            for text_hash, embedding in entries
+        ]).on_conflict_do_nothing(index_elements=["model", "text_hash"])
+        with db.engine.begin() as connection:
+            connection.execute(statement)
+    except Exception as e:
+        logger.warning(f"Could not persist embeddings to cache: {e}")
+
+@register_maintenance
+def prune_embedding_cache():
+    """
+    Delete embedding_cache rows older than EMBEDDING_CACHE_RETENTION_DAYS, so the table doesn't grow
+    with every chat turn. A text embedded again after that is sent to the API once more.
+    """
+    if not embeddingCacheRetentionDays:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=embeddingCacheRetentionDays)
+    pruned = EmbeddingCache.query.filter(EmbeddingCache.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    if pruned:
+        logger.info(f"Pruned {pruned} cached embeddings older than {embeddingCacheRetentionDays} days")
+    return pruned
+
+def generateUserSummary(session_summaries, previous_summary=None, incremental=False, raise_errors=False):
     """
     Generate an evolving user summary by comparing past and current session insights.
+    incremental=True marks a call with only the newly folded-in sessions, for the token metrics.
+    Failures return a placeholder, or raise with raise_errors=True so the caller can keep the old summary.
     """
     try:
         system_prompt = (
@@ -355,23 +742,41 @@ def generateUserSummary(session_summaries, previous_summary=None):
         summary_response = client.chat.completions.create(
             model=secondary_model,
             messages=user_summary_messages,
-            max_tokens=userSummaryMaxTokens
+            max_tokens=userSummaryMaxTokens,
+            timeout=summaryTimeout
         )
 
         logger.info(f"OpenAI API Usage Stats (User Summary): {summary_response.usage}")
+        record_user_summary_usage(summary_response.usage, len(session_summaries), incremental)
 
         summary = summary_response.choices[0].message.content.strip()
 
         if not summary:
             logger.warning("Generated user summary is empty.")
+            if raise_errors:
+                raise ValueError("Generated user summary is empty")
             return "Summary unavailable. Try refining the session details."
 
         return summary
 
     except Exception as e:
         logger.error(f"User Summary Generation Error: {e}")
+        if raise_errors:
+            raise
         return "An error occurred while generating the user summary."
     
+def record_user_summary_usage(usage, session_count, incremental):
+    """
+    Count user summary updates and their token usage, split by incremental vs full rebuild.
+    Prompt tokens per incremental update should stay flat as a user's history grows.
+    """
+    mode = "incremental" if incremental else "full"
+    user_summary_stats.incr(f"{mode}_updates")
+    user_summary_stats.incr(f"{mode}_sessions", session_count)
+    if usage is not None:
+        user_summary_stats.incr(f"{mode}_prompt_tokens", usage.prompt_tokens)
+        user_summary_stats.incr(f"{mode}_completion_tokens", usage.completion_tokens)
+
 def get_most_relevant_context(user_email, current_message, min_n=2, max_n=5, similarity_threshold=0.7):
     """
     Retrieve the most relevant session summaries and, if necessary, their full conversations.
@@ -384,83 +789,83 @@ def get_most_relevant_context(user_email, current_message, min_n=2, max_n=5, sim
             logger.info(f"[User: {user_email}] No UserSummary found - new user.")
             return []
 
-        # Handle missing or empty session_summaries
-        if not user_summary.session_summaries:
-            logger.info(f"[User: {user_email}] No session summaries found.")
-            return []
+        # Generate embedding for current message
+        current_embedding = generate_embedding(current_message)
 
-        # Parse session summaries, handle potential JSON errors
-        try:
-            session_summaries = (
-                user_summary.session_summaries 
-                if isinstance(user_summary.session_summaries, list) 
-                else json.loads(user_summary.session_summaries)
+        # Query the user's vector index; fall back to scanning the JSON embeddings if there isn't one
+        if current_embedding is not None:
+            indexed_sessions = get_indexed_relevant_sessions(
+                user_email, current_embedding, min_n, max_n, similarity_threshold, version=user_summary.updated_at
             )
-        except (json.JSONDecodeError, TypeError):
-            logger.warning(f"[User: {user_email}] Invalid session_summaries format.")
-            return []
-
-        # If no session summaries exist, return empty list
-        if not session_summaries:
-            return []
+            if indexed_sessions is not None:
+                return indexed_sessions
+
+        # Reuse the decoded embedding matrix while the user summary hasn't changed
+        cache_key = (user_email, str(user_summary.updated_at))
+        cached = session_matrix_cache.get(cache_key)
+        if cached is not None:
+            session_summaries, candidate_sessions, matrix, norms = cached
+        else:
+            # Handle missing or empty session_summaries
+            if not user_summary.session_summaries:
+                logger.info(f"[User: {user_email}] No session summaries found.")
+                return []
 
-        # Handle missing or empty session_embeddings
-        if not user_summary.session_embeddings:
-            logger.info(f"[User: {user_email}] No session embeddings found.")
-            return session_summaries[:min_n]  # Return most recent sessions if no embeddings
+            # Parse session summaries, handle potential JSON errors
+            try:
+                session_summaries = (
+                    user_summary.session_summaries 
+                    if isinstance(user_summary.session_summaries, list) 
+                    else json.loads(user_summary.session_summaries)
+                )
+            except (json.JSONDecodeError, TypeError):
+                logger.warning(f"[User: {user_email}] Invalid session_summaries format.")
+                return []
+
+            # If no session summaries exist, return empty list
+            if not session_summaries:
+                return []
+
+            # Handle missing or empty session_embeddings
+            if not user_summary.session_embeddings:
+                logger.info(f"[User: {user_email}] No session embeddings found.")
+                return session_summaries[:min_n]  # Return most recent sessions if no embeddings
+
+            # Unpack session embeddings as views over the stored bytes, handle corrupt blobs
+            try:
+                embedding_ids, embedding_matrix = decode_embedding_matrix(user_summary.session_embeddings)
+                session_embeddings = {str(session_id): row for session_id, row in zip(embedding_ids, embedding_matrix)}
+            except (ValueError, struct.error):
+                logger.warning(f"[User: {user_email}] Invalid session_embeddings format.")
+                return session_summaries[:min_n]  # Return most recent sessions if invalid embeddings
 
-        # Parse session embeddings, handle potential JSON errors
-        try:
-            session_embeddings = (
-                user_summary.session_embeddings 
-                if isinstance(user_summary.session_embeddings, dict) 
-                else json.loads(user_summary.session_embeddings)
-            )
-        except (json.JSONDecodeError, TypeError):
-            logger.warning(f"[User: {user_email}] Invalid session_embeddings format.")
-            return session_summaries[:min_n]  # Return most recent sessions if invalid embeddings
+            candidate_sessions, matrix, norms = build_session_matrix(user_email, session_summaries, session_embeddings)
+            session_matrix_cache.set(cache_key, (session_summaries, candidate_sessions, matrix, norms))
 
-        # Generate embedding for current message
-        current_embedding = generate_embedding(current_message)
-        if not current_embedding:
+        if current_embedding is None:
             logger.warning(f"[User: {user_email}] Could not generate embedding for current message.")
             return session_summaries[:min_n]  # Return most recent sessions if embedding fails
 
-        # Compute similarity scores for valid embeddings
-        similarity_scores = []
-        for session in session_summaries:
-            session_id = str(session['session_id'])
-            if session_id in session_embeddings:
-                try:
-                    session_embedding = np.array(session_embeddings[session_id]).reshape(1, -1)
-                    score = cosine_similarity([current_embedding], session_embedding)[0][0]
-                    similarity_scores.append((score, session))
-                except (ValueError, TypeError):
-                    logger.warning(f"[User: {user_email}] Invalid embedding format for session {session_id}")
-                    continue
+        # Score every session at once against the user's embedding matrix
+        query = np.asarray(current_embedding, dtype=np.float32)
 
         # If we couldn't compute any similarity scores, return most recent sessions
-        if not similarity_scores:
+        if not candidate_sessions or matrix.shape[1] != query.shape[0]:
             return session_summaries[:min_n]
 
-        # Sort by relevance (highest to lowest)
-        similarity_scores.sort(reverse=True, key=lambda x: x[0])
+        scores = score_session_matrix(matrix, norms, query)
+        ranked = rank_relevant_sessions(scores, min_n, max_n, similarity_threshold)
+        relevant_sessions = [candidate_sessions[i] for i in ranked]
 
-        # Get minimum required sessions
-        relevant_sessions = [s[1] for s in similarity_scores[:min_n]]
-        
-        # Add additional sessions up to max_n if they meet threshold
-        for score, session in similarity_scores[min_n:]:
-            if score >= similarity_threshold and len(relevant_sessions) < max_n:
-                relevant_sessions.append(session)
-        
-        # Log included and excluded scores
-        included_scores = [f"{score:.3f}" for score, _ in similarity_scores[:len(relevant_sessions)]]
-        excluded_scores = [f"{score:.3f}" for score, _ in similarity_scores[len(relevant_sessions):]]
+        # Log included scores and the best excluded one
+        included_scores = [f"{scores[i]:.3f}" for i in ranked]
+        excluded_count = len(candidate_sessions) - len(ranked)
+        excluded_scores = np.delete(scores, ranked)
+        best_excluded = f"{excluded_scores.max():.3f}" if excluded_count else "none"
         logger.info(f"[User: {user_email}] Returning {len(relevant_sessions)} relevant sessions "
                    f"(minimum {min_n}, maximum {max_n}, threshold {similarity_threshold}). "
                    f"Included scores: {', '.join(included_scores)}. "
-                   f"Excluded scores: {', '.join(excluded_scores) if excluded_scores else 'none'}")
+                   f"Excluded {excluded_count} sessions, best excluded score: {best_excluded}")
         
         return relevant_sessions
 
@@ -468,18 +873,136 @@ def get_most_relevant_context(user_email, current_message, min_n=2, max_n=5, sim
         logger.error(f"[User: {user_email}] Error in get_most_relevant_context: {str(e)}")
         return []  # Return empty list on any error
 
-def analyze_sentiment(text):
-    """Analyze sentiment using VADER (for fast analysis)."""
-    score = sia.polarity_scores(text)['compound']
-    
-    if score >= 0.3:
-        sentiment = "Positive"
-    elif score <= -0.3:
-        sentiment = "Negative"
+def get_indexed_relevant_sessions(user_email, current_embedding, min_n, max_n, similarity_threshold, version=None):
+    """
+    Same selection rules as get_most_relevant_context, served from the user's FAISS index.
+    version is the user summary's updated_at, so an index built before the latest changes is rebuilt.
+    Hits are re-checked against the database (the user's own, kept, summarized sessions), and the
+    search asks for indexSearchHeadroom extra hits so ones dropped there don't leave fewer than min_n.
+    Returns None if the user has no index, so the caller can fall back.
+    """
+    try:
+        result = search_user_sessions(
+            user_email, current_embedding, max(min_n, max_n) + indexSearchHeadroom, version=version
+        )
+    except Exception as e:
+        logger.error(f"[User: {user_email}] Vector index search failed: {e}")
+        return None
+    if result is None:
+        return None
+    session_ids, scores = result
+
+    # Fetch just the summaries of the hits
+    rows = ChatSession.query.with_entities(ChatSession.id, ChatSession.summary, ChatSession.timestamp).filter(
+        ChatSession.id.in_([int(i) for i in session_ids]),
+        ChatSession.user_email == user_email,
+        ChatSession.is_deleted == False,
+        ChatSession.is_archived == False,
+        ChatSession.summary.isnot(None)
+    ).all()
+    sessions_by_id = {
+        row.id: {
+            'session_id': row.id,
+            'summary': row.summary,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None
+        }
+        for row in rows
+    }
+
+    found = np.asarray([int(i) in sessions_by_id for i in session_ids], dtype=bool)
+    session_ids, scores = session_ids[found], scores[found]
+    ranked = rank_relevant_sessions(scores, min_n, max_n, similarity_threshold)
+
+    included_scores = [f"{scores[i]:.3f}" for i in ranked]
+    logger.info(f"[User: {user_email}] Returning {len(ranked)} relevant sessions from vector index "
+               f"(minimum {min_n}, maximum {max_n}, threshold {similarity_threshold}). "
+               f"Included scores: {', '.join(included_scores)}.")
+
+    return [sessions_by_id[int(session_ids[i])] for i in ranked]
+
+def build_session_matrix(user_email, session_summaries, session_embeddings):
+    """
+    Load the user's session embeddings as one contiguous float32 matrix with precomputed row norms.
+    Returns (candidate_sessions, matrix, norms); row i of the matrix belongs to candidate_sessions[i].
+    Sessions without a usable embedding are left out, and rows keep the session_summaries order.
+    """
+    candidate_sessions = []
+    rows = []
+    for session in session_summaries:
+        session_id = str(session['session_id'])
+        if session_id in session_embeddings:
+            try:
+                rows.append(np.asarray(session_embeddings[session_id], dtype=np.float32).ravel())
+                candidate_sessions.append(session)
+            except (ValueError, TypeError):
+                logger.warning(f"[User: {user_email}] Invalid embedding format for session {session_id}")
+
+    # Keep only rows matching the dominant dimension so the matrix is rectangular
+    if rows:
+        dimension = Counter(row.shape[0] for row in rows).most_common(1)[0][0]
+        keep = [i for i, row in enumerate(rows) if row.shape[0] == dimension]
+        if len(keep) != len(rows):
+            logger.warning(f"[User: {user_email}] Skipping {len(rows) - len(keep)} embeddings with unexpected dimensions")
+        candidate_sessions = [candidate_sessions[i] for i in keep]
+        matrix = np.ascontiguousarray(np.vstack([rows[i] for i in keep]))
     else:
-        sentiment = "Neutral"
+        matrix = np.empty((0, 0), dtype=np.float32)
 
-    return {"sentiment": sentiment, "sentiment_score": score}
+    norms = np.linalg.norm(matrix, axis=1) if matrix.size else np.empty(0, dtype=np.float32)
+    return candidate_sessions, matrix, norms
+
+def score_session_matrix(matrix, norms, query):
+    """
+    Cosine similarity of every row against the query with a single matrix-vector product.
+    Zero vectors score 0, matching sklearn's cosine_similarity.
+    """
+    denominators = norms * np.linalg.norm(query)
+    dots = matrix @ query
+    return np.divide(dots, denominators, out=np.zeros_like(dots), where=denominators > 0)
+
+def rank_relevant_sessions(scores, min_n, max_n, similarity_threshold):
+    """
+    Pick row indices in descending score order: always the top min_n, then any further rows
+    up to max_n that meet the threshold. Ties keep the original (most recent first) order.
+    """
+    count = scores.shape[0]
+    limit = min(max(min_n, max_n), count)
+    if limit <= 0:
+        return []
+
+    if limit < count:
+        top = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        top = np.arange(count)
+    top = top[np.lexsort((top, -scores[top]))]
+
+    ranked = list(top[:min_n])
+    for i in top[min_n:]:
+        if scores[i] >= similarity_threshold and len(ranked) < max_n:
+            ranked.append(i)
+    return [int(i) for i in ranked]
+
+def get_sentiment_analyzer():
+    """
+    The process-wide VADER analyzer, created on first use.
+    Raises LookupError if the lexicon hasn't been provisioned.
+    """
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        with _sentiment_analyzer_lock:
+            if _sentiment_analyzer is None:
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                if vaderLexiconPath:
+                    _sentiment_analyzer = SentimentIntensityAnalyzer(lexicon_file=f"file:{vaderLexiconPath}")
+                else:
+                    _sentiment_analyzer = SentimentIntensityAnalyzer()
+                logger.info("Loaded VADER sentiment lexicon")
+    return _sentiment_analyzer
+
+def analyze_sentiment(text):
+    """Analyze sentiment using VADER (for fast analysis)."""
+    score = get_sentiment_analyzer().polarity_scores(text)['compound']
+    return {"sentiment": sentiment_label(score), "sentiment_score": score}
 
 def get_most_recent_session_context(user_email):
     """
@@ -497,7 +1020,7 @@ def get_most_recent_session_context(user_email):
         if not recent_session:
             return None
 
-        messages = json.loads(recent_session.messages)
+        messages = recent_session.get_messages()
         if not messages:
             return None
 
@@ -512,7 +1035,9 @@ def get_most_recent_session_context(user_email):
         response = client.chat.completions.create(
             model=secondary_model,
             messages=[{"role": "system", "content": prompt}],
-            max_tokens=300
+            max_tokens=300,
+            timeout=contextTimeout,
+            max_retries=contextMaxRetries
         )
 
         logger.info(f"OpenAI API Usage Stats (Recent Session Context): {response.usage}")
@@ -1,4 +1,17 @@
 from firebase_admin import auth
+from app.utils.cache import LRUCache
+from app.utils.metrics import Counters
+import hashlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Decoded ID token claims, keyed by sha256 of the token; entries expire at the token's exp at the latest
+authCacheTTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+token_cache = LRUCache("auth_token", maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")))
+token_stats = Counters("auth", "cache_hits", "verifications")
 
 def verify_firebase_token(token):
     try:
@@ -14,4 +27,27 @@ def verify_firebase_token(token):
         return None
     except Exception as e:
         print(f"Token verification error: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+
+def verify_id_token_cached(token):
+    """
+    verify_id_token with a bounded TTL cache of the decoded claims, so the burst of requests
+    a page load makes verifies the signature once. A cached entry never outlives the token's exp.
+    Verification errors are raised as from verify_id_token and are not cached.
+    Google's signing certificates are cached by firebase_admin itself, per their Cache-Control max-age.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = token_cache.get(key)
+    if cached is not None:
+        claims, expires_at = cached
+        if time.time() < expires_at:
+            token_stats.incr("cache_hits")
+            return claims
+        token_cache.pop(key)
+
+    claims = auth.verify_id_token(token)
+    token_stats.incr("verifications")
+    expires_at = min(time.time() + authCacheTTL, claims.get("exp", 0))
+    if expires_at > time.time():
+        token_cache.set(key, (claims, expires_at))
+    return claims
@@ -0,0 +1,122 @@
+from app.models.assistant import Assistant
+from app.models.goals import Goals
+from app.utils.metrics import register_metrics
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a catalog is reloaded, to pick up rows changed by other processes
+catalogTTL = float(os.getenv("CATALOG_TTL", "60"))
+
+
+class Catalog:
+    """
+    Process-wide copy of a small, rarely-changing table (assistants, goals), keyed by id.
+    Loaded with one query and dropped after any commit that touched the model in this
+    process; reloaded after CATALOG_TTL seconds to pick up changes made elsewhere.
+    """
+
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+        self._lock = threading.Lock()
+        self._entries = None
+        self._version = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+        _catalogs.append(self)
+        register_metrics(f"catalog.{name}", self.stats)
+
+    def _ensure_loaded(self):
+        """Return (entries, version), loading them if missing or expired. Needs an app context."""
+        with self._lock:
+            if self._entries is not None and time.monotonic() - self._loaded_at < catalogTTL:
+                self.hits += 1
+                return self._entries, self._version
+
+        rows = self.model.query.order_by(self.model.id).all()
+        entries = {row.id: row.to_dict() for row in rows}
+        version = hashlib.sha1(json.dumps(list(entries.values()), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+        with self._lock:
+            self._entries = entries
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        return entries, version
+
+    def all(self):
+        """All rows as dicts, keyed by id. Treat the result as read-only."""
+        return self._ensure_loaded()[0]
+
+    def get(self, entry_id):
+        """One row as a dict, or None."""
+        return self.all().get(entry_id)
+
+    def version(self):
+        """Content hash of the loaded rows; changes whenever any row does."""
+        return self._ensure_loaded()[1]
+
+    def visible_to(self, user_email):
+        """Rows a user may pick: not globally hidden, and created by admin or by that user."""
+        return [
+            entry for entry in self.all().values()
+            if entry["is_globally_hidden"] is False and entry["created_by"] in ("admin", user_email)
+        ]
+
+    def etag(self, user_email):
+        """ETag for a user's visible rows: the catalog version plus the user, since visibility differs per user."""
+        user_hash = hashlib.sha1(user_email.encode("utf-8")).hexdigest()[:8]
+        return f"{self.version()}-{user_hash}"
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+            self._version = None
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries) if self._entries is not None else 0,
+                "version": self._version,
+                "hits": self.hits,
+                "loads": self.loads,
+                "invalidations": self.invalidations
+            }
+
+
+_catalogs = []
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_changes(session, flush_context):
+    changed = {type(obj) for obj in (*session.new, *session.dirty, *session.deleted)}
+    for catalog in _catalogs:
+        if catalog.model in changed:
+            session.info.setdefault("changed_catalogs", set()).add(catalog)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_catalogs(session):
+    for catalog in session.info.pop("changed_catalogs", ()):
+        logger.info(f"Catalog '{catalog.name}' changed, reloading on next use")
+        catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_catalog_changes(session):
+    session.info.pop("changed_catalogs", None)
+
+
+assistant_catalog = Catalog("assistants", Assistant)
+goal_catalog = Catalog("goals", Goals)
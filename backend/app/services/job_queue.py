@@ -0,0 +1,268 @@
+from app.__init__ import db
+from app.models.job import Job
+from app.services.openai_client import CircuitOpenError, breakerCooldown
+from app.utils.metrics import Counters
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import or_, and_, update
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+jobMaxAttempts = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+jobPollInterval = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # Seconds between polls when idle
+jobLockTimeout = int(os.getenv("JOB_LOCK_TIMEOUT", "600"))  # Seconds without a heartbeat before a running job is presumed dead
+jobHeartbeatInterval = float(os.getenv("JOB_HEARTBEAT_INTERVAL", str(jobLockTimeout / 4)))  # Seconds between lock renewals
+jobRetryBaseDelay = float(os.getenv("JOB_RETRY_BASE_DELAY", "5"))  # Seconds, doubled per attempt
+# Finished jobs are deleted after these many seconds (0 keeps them); failed ones stay longer for inspection
+jobRetention = int(os.getenv("JOB_RETENTION", "86400"))
+jobFailedRetention = int(os.getenv("JOB_FAILED_RETENTION", "2592000"))
+jobPruneInterval = float(os.getenv("JOB_PRUNE_INTERVAL", "300"))  # Seconds between maintenance runs in each worker
+jobPruneBatchSize = 5000
+
+job_stats = Counters("job_queue", "enqueued", "succeeded", "retried", "deferred", "failed", "heartbeats", "pruned")
+
+# Job kind -> handler(payload). Handlers are registered where the work is defined.
+_handlers = {}
+# Periodic cleanup functions each worker runs every jobPruneInterval seconds
+_maintenance = []
+# The job this thread's handler is running, for update_job_payload
+_running = threading.local()
+
+
+def register_job(kind):
+    """
+    Decorator registering a function as the handler for a job kind.
+    The handler receives the job payload and runs inside an app context.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def update_job_payload(**changes):
+    """
+    Merge changes into the running job's payload in the handler's transaction, so progress the
+    handler commits is still there when the job is retried. Does nothing outside a job.
+    """
+    job = getattr(_running, "job", None)
+    if job is not None:
+        job.payload = {**job.payload, **changes}
+
+
+def register_maintenance(func):
+    """
+    Decorator registering a function the workers call every jobPruneInterval seconds,
+    inside an app context, e.g. to prune rows past their retention.
+    """
+    _maintenance.append(func)
+    return func
+
+
+def enqueue_job(kind, payload, user_email=None, max_attempts=None):
+    """
+    Add a job to the caller's session and flush it so it has an ID. The caller commits,
+    so the job becomes visible to workers together with the changes that triggered it.
+    """
+    job = Job(
+        kind=kind,
+        payload=payload,
+        user_email=user_email,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or jobMaxAttempts,
+        run_after=datetime.now(timezone.utc)
+    )
+    db.session.add(job)
+    db.session.flush()
+    job_stats.incr("enqueued")
+    logger.info(f"[User: {user_email}] Enqueued {kind} job {job.id}")
+    return job
+
+
+def claim_next_job(worker_id):
+    """
+    Claim the oldest runnable job with FOR UPDATE SKIP LOCKED, so concurrent workers never
+    take the same job. Running jobs whose lock has expired (crashed worker) are claimed again.
+    """
+    now = datetime.now(timezone.utc)
+    job = Job.query.filter(
+        or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=jobLockTimeout))
+        )
+    ).order_by(Job.id.asc()).with_for_update(skip_locked=True).first()
+
+    if not job:
+        db.session.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.locked_at = now
+    job.locked_by = worker_id
+    job.updated_at = now
+    db.session.commit()
+    return job
+
+
+class _Heartbeat:
+    """
+    Renews a running job's lock every jobHeartbeatInterval seconds on its own connection, so a job
+    that runs longer than jobLockTimeout isn't reclaimed by another worker while it is still alive.
+    """
+
+    def __init__(self, engine, job_id, worker_id):
+        self._engine = engine
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(jobHeartbeatInterval):
+            try:
+                with self._engine.begin() as connection:
+                    connection.execute(
+                        update(Job.__table__)
+                        .where(Job.id == self._job_id, Job.status == "running", Job.locked_by == self._worker_id)
+                        .values(locked_at=datetime.now(timezone.utc))
+                    )
+                job_stats.incr("heartbeats")
+            except Exception as e:
+                logger.warning(f"Could not renew the lock on job {self._job_id}: {e}")
+
+
+def run_job(job):
+    """
+    Run a claimed job's handler and record the outcome. Failures are retried with
+    exponential backoff and jitter until max_attempts, then marked failed. While the OpenAI
+    circuit breaker is open the job is deferred past its cooldown without using up an attempt.
+    The job's lock is renewed by a heartbeat while the handler runs.
+    """
+    handler = _handlers.get(job.kind)
+    heartbeat = _Heartbeat(db.engine, job.id, job.locked_by)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        _running.job = job
+        try:
+            with heartbeat:
+                handler(job.payload)
+        finally:
+            _running.job = None
+        db.session.commit()
+
+        job.status = "succeeded"
+        job.last_error = None
+        job.finished_at = datetime.now(timezone.utc)
+        job_stats.incr("succeeded")
+        logger.info(f"[User: {job.user_email}] Job {job.id} ({job.kind}) succeeded on attempt {job.attempts}")
+
+    except Exception as e:
+        db.session.rollback()
+        job.last_error = f"{e}\n{traceback.format_exc()}"[-4000:]
+        if isinstance(e, CircuitOpenError):
+            delay = breakerCooldown * random.uniform(1.0, 1.5)
+            job.attempts -= 1
+            job.status = "queued"
+            job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            job_stats.incr("deferred")
+            logger.warning(f"[User: {job.user_email}] Job {job.id} ({job.kind}) deferred {delay:.0f}s: {e}")
+        elif job.attempts < job.max_attempts:
+            delay = jobRetryBaseDelay * (2 ** (job.attempts - 1)) * random.uniform(0.5, 1.5)
+            job.status = "queued"
+            job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            job_stats.incr("retried")
+            logger.warning(f"[User: {job.user_email}] Job {job.id} ({job.kind}) failed on attempt {job.attempts}, "
+                           f"retrying in {delay:.0f}s: {e}")
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.now(timezone.utc)
+            job_stats.incr("failed")
+            logger.error(f"[User: {job.user_email}] Job {job.id} ({job.kind}) failed permanently: {e}")
+
+    job.locked_at = None
+    job.locked_by = None
+    job.updated_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return job
+
+
+@register_maintenance
+def prune_jobs():
+    """
+    Delete succeeded jobs finished more than jobRetention seconds ago, and failed ones after
+    jobFailedRetention, in batches so no single statement locks many rows. Returns the number deleted.
+    """
+    now = datetime.now(timezone.utc)
+    pruned = 0
+    for status, retention in (("succeeded", jobRetention), ("failed", jobFailedRetention)):
+        if not retention:
+            continue
+        cutoff = now - timedelta(seconds=retention)
+        while True:
+            batch = db.session.query(Job.id).filter(
+                Job.status == status,
+                Job.finished_at < cutoff
+            ).limit(jobPruneBatchSize).subquery()
+            deleted = Job.query.filter(Job.id.in_(db.session.query(batch.c.id))).delete(synchronize_session=False)
+            db.session.commit()
+            pruned += deleted
+            if deleted < jobPruneBatchSize:
+                break
+    if pruned:
+        job_stats.incr("pruned", pruned)
+        logger.info(f"Pruned {pruned} finished jobs")
+    return pruned
+
+
+def run_worker(once=False):
+    """
+    Process jobs until stopped. With once=True, drains the runnable jobs and returns how many ran.
+    Maintenance (pruning finished jobs and other expired rows) runs every jobPruneInterval seconds.
+    Must be called inside an app context.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Job worker {worker_id} started")
+    processed = 0
+    last_pruned = 0.0
+    while True:
+        if time.monotonic() - last_pruned >= jobPruneInterval:
+            last_pruned = time.monotonic()
+            for task in _maintenance:
+                try:
+                    task()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Job worker {worker_id} maintenance {task.__name__} failed: {e}")
+
+        try:
+            job = claim_next_job(worker_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Job worker {worker_id} could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            if once:
+                return processed
+            time.sleep(jobPollInterval)
+            continue
+
+        run_job(job)
+        processed += 1
@@ -0,0 +1,260 @@
+from app.utils.metrics import register_metrics
+from collections import deque
+from config import Config
+from types import SimpleNamespace
+import httpx
+import logging
+import openai
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Per-call-type timeouts (seconds). httpx applies the read timeout between received bytes,
+# so for streams it bounds the gap between chunks, not the whole reply.
+openaiConnectTimeout = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+chatTimeout = float(os.getenv("OPENAI_TIMEOUT_CHAT", "30"))  # The reply the user is waiting for
+contextTimeout = float(os.getenv("OPENAI_TIMEOUT_CONTEXT", "6"))  # Context enrichment on the response path
+summaryTimeout = float(os.getenv("OPENAI_TIMEOUT_SUMMARY", "120"))  # Session and user summaries, in the worker
+embeddingTimeout = float(os.getenv("OPENAI_TIMEOUT_EMBEDDING", "15"))
+
+# Retries of timeouts, connection errors, 429s and 5xx, with the SDK's exponential backoff and jitter
+openaiMaxRetries = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# Context enrichment isn't retried by default: a stage that misses its deadline is dropped anyway,
+# and retries would only keep an abandoned request and its connection busy
+contextMaxRetries = int(os.getenv("OPENAI_MAX_RETRIES_CONTEXT", "0"))
+
+# Keep-alive connection pool, per process
+openaiMaxConnections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+openaiMaxKeepaliveConnections = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "16"))
+
+# Circuit breaker: opens when at least BREAKER_MIN_CALLS calls in the last BREAKER_WINDOW seconds
+# had an upstream failure rate of BREAKER_ERROR_RATE or more; after BREAKER_COOLDOWN seconds one trial call is let through
+breakerWindow = float(os.getenv("OPENAI_BREAKER_WINDOW", "30"))
+breakerMinCalls = int(os.getenv("OPENAI_BREAKER_MIN_CALLS", "10"))
+breakerErrorRate = float(os.getenv("OPENAI_BREAKER_ERROR_RATE", "0.5"))
+breakerCooldown = float(os.getenv("OPENAI_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+def is_upstream_failure(error):
+    """Errors that say OpenAI is slow or unhealthy. Bad requests and auth errors don't trip the breaker."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over a sliding time window of call outcomes.
+    closed: calls go through. open: calls fail fast with CircuitOpenError until the cooldown ends.
+    half_open: a single trial call goes through; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, window, min_calls, error_rate, cooldown):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic time, failed)
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opened = 0
+        self.short_circuited = 0
+
+    def _trim(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go through."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(f"{self.name} circuit is open after repeated upstream failures")
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(f"{self.name} circuit is half-open, waiting on a trial call")
+                self._trial_in_flight = True
+
+    def record(self, failed):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "half_open":
+                self._trial_in_flight = False
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                    logger.info(f"{self.name} circuit closed")
+                return
+
+            self._outcomes.append((now, failed))
+            self._trim(now)
+            failures = sum(1 for _, outcome in self._outcomes if outcome)
+            if (self.state == "closed" and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.error_rate):
+                self._open(now)
+
+    def _open(self, now):
+        self.state = "open"
+        self._opened_at = now
+        self.opened += 1
+        logger.error(f"{self.name} circuit opened; failing fast for {self.cooldown:.0f}s")
+
+    def stats(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failures": sum(1 for _, outcome in self._outcomes if outcome),
+                "opened": self.opened,
+                "short_circuited": self.short_circuited
+            }
+
+
+class _MonitoredStream:
+    """Wraps a streamed completion so failures while reading it count against the breaker."""
+
+    def __init__(self, owner, stream):
+        self._owner = owner
+        self._stream = stream
+        self._finished = False
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._finish(None)
+
+    def _finish(self, error):
+        if not self._finished:
+            self._finished = True
+            self._owner._record(error)
+
+    def close(self):
+        self._stream.close()
+        self._finish(None)
+
+
+class _Endpoint:
+    """client.chat.completions / client.embeddings: create() goes through the breaker and the metrics."""
+
+    def __init__(self, owner, path, default_timeout):
+        self._owner = owner
+        self._path = path
+        self._default_timeout = default_timeout
+
+    def create(self, max_retries=None, **kwargs):
+        kwargs.setdefault("timeout", self._default_timeout)
+        return self._owner._call(self._path, kwargs, max_retries)
+
+
+class OpenAIClient:
+    """
+    The process's OpenAI client: one keep-alive connection pool, bounded retries with backoff,
+    per-call timeouts (pass timeout=, else the endpoint's default) and retries (max_retries=), and a circuit breaker.
+    Exposes the SDK's client.chat.completions.create and client.embeddings.create.
+    The underlying SDK client is created on first use in each process, so workers forked
+    from a preloaded master never share sockets.
+    """
+
+    def __init__(self, name="openai"):
+        self.name = name
+        self.breaker = CircuitBreaker(name, breakerWindow, breakerMinCalls, breakerErrorRate, breakerCooldown)
+        self.chat = SimpleNamespace(completions=_Endpoint(self, ("chat", "completions"), chatTimeout))
+        self.embeddings = _Endpoint(self, ("embeddings",), embeddingTimeout)
+        self._lock = threading.Lock()
+        self._client = None
+        self._retry_clients = {}  # max_retries -> SDK client sharing _client's connection pool
+        self._pid = None
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        register_metrics(f"{name}_client", self.stats)
+
+    def _sdk_client(self, max_retries=None):
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=openaiMaxConnections,
+                        max_keepalive_connections=openaiMaxKeepaliveConnections
+                    ),
+                    timeout=httpx.Timeout(chatTimeout, connect=openaiConnectTimeout)
+                )
+                self._client = openai.OpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    max_retries=openaiMaxRetries,
+                    http_client=http_client
+                )
+                self._retry_clients = {}
+                self._pid = os.getpid()
+            if max_retries is None:
+                return self._client
+            if max_retries not in self._retry_clients:
+                self._retry_clients[max_retries] = self._client.with_options(max_retries=max_retries)
+            return self._retry_clients[max_retries]
+
+    def _call(self, path, kwargs, max_retries=None):
+        self.breaker.before_call()
+        target = self._sdk_client(max_retries)
+        for attribute in path:
+            target = getattr(target, attribute)
+
+        timeout = kwargs["timeout"]
+        if not isinstance(timeout, httpx.Timeout):
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=openaiConnectTimeout)
+
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+        try:
+            result = target.create(**kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+
+        if kwargs.get("stream"):
+            return _MonitoredStream(self, result)  # In flight until read to the end or closed
+        self._record(None)
+        return result
+
+    def _record(self, error):
+        failed = error is not None and is_upstream_failure(error)
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failures += 1
+        # A request OpenAI rejected (bad request, auth) counts as a healthy call
+        self.breaker.record(failed)
+
+    def stats(self):
+        with self._lock:
+            values = {
+                "calls": self.calls,
+                "upstream_failures": self.failures,
+                "in_flight": self.in_flight,
+                "max_connections": openaiMaxConnections
+            }
+        values["breaker"] = self.breaker.stats()
+        return values
+
+
+client = OpenAIClient()
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Tokenizer used for stored per-message counts; matches the main chat model
+tokenizer_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# Prompt token budget for the main completion (system prompt, summaries, insights and session turns)
+contextTokenBudget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "16000"))
+
+# Chat format overhead per message (role, separators), on top of the content tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+# Used when no tokenizer can be loaded (e.g. tiktoken can't fetch its BPE file)
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model):
+    """
+    Return the tiktoken encoder for a model, loaded once per process.
+    Returns None if it can't be loaded; counts then fall back to a character estimate.
+    """
+    encoder = _encoders.get(model, False)
+    if encoder is not False:
+        return encoder
+
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                from tiktoken import encoding_for_model, get_encoding
+                try:
+                    _encoders[model] = encoding_for_model(model)
+                except KeyError:
+                    _encoders[model] = get_encoding("o200k_base")  # Unknown model name
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer for {model}, estimating token counts instead: {e}")
+                _encoders[model] = None
+        return _encoders[model]
+
+
+def count_tokens(text, model):
+    """
+    Count the tokens in a piece of text with the cached encoder.
+    """
+    if not text:
+        return 0
+    encoder = get_encoder(model)
+    if encoder is None:
+        return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def message_tokens(message, model):
+    """
+    Tokens a chat message costs in the prompt. The count is stored on the message dict as
+    token_count, so a message is only counted once (and append_messages can persist it).
+    """
+    if message.get("token_count") is None:
+        message["token_count"] = count_tokens(message.get("content", ""), model)
+    return message["token_count"] + MESSAGE_OVERHEAD_TOKENS
+
+
+def fit_to_budget(required_messages, optional_sections, history, model, budget=None):
+    """
+    Decide what fits into the prompt budget, in a fixed priority order:
+      1. required_messages (system prompt, closing instructions) and the latest history turn - always kept
+      2. optional_sections, in the order given (e.g. user summary, recent context, insights)
+      3. the remaining history turns, newest first
+    optional_sections is a list of (name, message) pairs.
+    Returns (kept section names, kept history in chronological order, tokens used).
+    """
+    budget = contextTokenBudget if budget is None else budget
+
+    used = sum(message_tokens(message, model) for message in required_messages)
+    if history:
+        used += message_tokens(history[-1], model)
+
+    kept_sections = set()
+    for name, message in optional_sections:
+        cost = message_tokens(message, model)
+        if used + cost <= budget:
+            kept_sections.add(name)
+            used += cost
+        else:
+            logger.info(f"Context budget: dropping '{name}' ({cost} tokens, {used}/{budget} used)")
+
+    # Walk back from the newest turn until the budget runs out
+    first_kept = len(history) - 1 if history else 0
+    for i in range(len(history) - 2, -1, -1):
+        cost = message_tokens(history[i], model)
+        if used + cost > budget:
+            break
+        used += cost
+        first_kept = i
+
+    if first_kept > 0:
+        logger.info(f"Context budget: dropping {first_kept} older session messages ({used}/{budget} tokens used)")
+
+    return kept_sections, history[first_kept:], used
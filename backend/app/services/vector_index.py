@@ -0,0 +1,318 @@
+from app.models.chat_session import ChatSession
+from app.models.user_summary import UserSummary
+from app.utils.cache import LRUCache
+from app.utils.metrics import Counters
+from app.utils.embeddings import decode_embedding
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import faiss
+import numpy as np
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# One FAISS index per user, persisted under VECTOR_INDEX_DIR and memory-mapped by every worker.
+# Next to each index, <index>.version records the user summary's updated_at it was built for;
+# an index whose version doesn't match the database is rebuilt in the background, and searches
+# fall back to the user summary's embedding matrix until it is.
+index_dir = os.getenv(
+    "VECTOR_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "vector_indexes")
+)
+preload_indexes_on_startup = str(os.getenv("VECTOR_INDEX_PRELOAD", "false")).lower() == "true"
+
+# Loaded indexes, keyed by index path -> (index, file mtime when loaded)
+loaded_indexes = LRUCache("vector_index", maxsize=int(os.getenv("VECTOR_INDEX_CACHE_SIZE", "512")))
+index_stats = Counters("vector_index.ops", "searches", "loads", "rebuilds", "stale_rebuilds", "stamps", "upserts", "removals")
+# Index path -> in-process write lock, kept while a writer holds or waits for it
+_write_locks = weakref.WeakValueDictionary()
+_write_locks_guard = threading.Lock()
+# Missing and stale indexes are rebuilt here, off the request path; a user is queued at most once
+rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-index-rebuild")
+_pending_rebuilds = set()
+_pending_rebuilds_lock = threading.Lock()
+
+
+def _index_path(user_email):
+    user_hash = hashlib.sha256(user_email.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(index_dir, f"{user_hash}.faiss")
+
+
+def _read_version(path):
+    """The version an index (or a user's lack of one) was built for, or None if it never was."""
+    try:
+        with open(f"{path}.version") as handle:
+            return handle.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_version(path, version):
+    temp_path = f"{path}.version.tmp.{os.getpid()}"
+    with open(temp_path, "w") as handle:
+        handle.write(version)
+    os.replace(temp_path, f"{path}.version")
+
+
+def _current_version(user_email):
+    """The database state a user's index reflects: their user summary's updated_at, which changes
+    whenever sessions are finalized, archived or deleted."""
+    updated_at = UserSummary.query.with_entities(UserSummary.updated_at).filter_by(user_email=user_email).scalar()
+    return str(updated_at)
+
+
+def _normalize(vectors):
+    """L2-normalize rows so inner product equals cosine similarity. Zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _decode_embedding(embedding):
+    """Read a stored ChatSession.embedding as a float32 vector, or None if unusable."""
+    try:
+        return decode_embedding(embedding)
+    except ValueError:
+        return None
+
+
+def _is_indexed(session):
+    """Only sessions that feed the user summary are searchable."""
+    return session.is_ended and not session.is_archived and not session.is_deleted
+
+
+class _UserIndexLock:
+    """
+    Exclusive lock on one user's index file while it is rewritten: a per-user lock between threads,
+    and flock between processes. Writes for different users don't wait on each other.
+    """
+
+    def __init__(self, path):
+        self.lock_path = f"{path}.lock"
+        with _write_locks_guard:
+            self.thread_lock = _write_locks.get(path)
+            if self.thread_lock is None:
+                self.thread_lock = threading.Lock()
+                _write_locks[path] = self.thread_lock
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        self.handle = open(self.lock_path, "w")
+        fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+        self.thread_lock.release()
+
+
+def _write_index(index, path):
+    """Write to a temp file and rename, so readers never see a half-written index."""
+    temp_path = f"{path}.tmp.{os.getpid()}"
+    faiss.write_index(index, temp_path)
+    os.replace(temp_path, path)
+
+
+def rebuild_user_index(user_email, version=None):
+    """
+    Build a user's index from scratch out of ChatSession.embedding and persist it, stamped with
+    version (the user summary's updated_at; looked up if not given). A user without vectors gets
+    no index file but still a version, so searches don't rebuild it again until something changes.
+    Returns the number of sessions indexed.
+    """
+    if version is None:
+        version = _current_version(user_email)
+    sessions = ChatSession.query.with_entities(ChatSession.id, ChatSession.embedding).filter_by(
+        user_email=user_email, is_deleted=False, is_archived=False, is_ended=True
+    ).filter(ChatSession.embedding.isnot(None)).all()
+
+    ids = []
+    rows = []
+    for session_id, embedding in sessions:
+        vector = _decode_embedding(embedding)
+        if vector is not None:
+            ids.append(session_id)
+            rows.append(vector)
+
+    path = _index_path(user_email)
+    os.makedirs(index_dir, exist_ok=True)
+
+    with _UserIndexLock(path):
+        if not rows:
+            if os.path.exists(path):
+                os.remove(path)
+            _write_version(path, str(version))
+            loaded_indexes.pop(path)
+            return 0
+
+        # Keep only rows matching the dominant dimension
+        dimension = Counter(row.shape[0] for row in rows).most_common(1)[0][0]
+        keep = [i for i, row in enumerate(rows) if row.shape[0] == dimension]
+        matrix = _normalize(np.vstack([rows[i] for i in keep]))
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        index.add_with_ids(matrix, np.asarray([ids[i] for i in keep], dtype=np.int64))
+        _write_index(index, path)
+        _write_version(path, str(version))
+
+    index_stats.incr("rebuilds")
+    logger.info(f"[User: {user_email}] Rebuilt vector index with {len(keep)} sessions.")
+    return len(keep)
+
+
+def sync_session_embedding(session):
+    """
+    Bring one session's entry in its user's index up to date after its embedding or status changed.
+    Searchable sessions with an embedding are upserted; everything else is removed.
+    """
+    try:
+        path = _index_path(session.user_email)
+        vector = _decode_embedding(session.embedding) if _is_indexed(session) else None
+
+        if not os.path.exists(path):
+            # No index yet: build the whole thing, which also picks this session up
+            rebuild_user_index(session.user_email)
+            return
+
+        dimension_changed = False
+        with _UserIndexLock(path):
+            index = faiss.read_index(path)
+            if vector is not None and vector.shape[0] != index.d:
+                dimension_changed = True
+            else:
+                ids = np.asarray([session.id], dtype=np.int64)
+                index.remove_ids(ids)
+                if vector is not None:
+                    index.add_with_ids(_normalize(vector.reshape(1, -1)), ids)
+                    index_stats.incr("upserts")
+                else:
+                    index_stats.incr("removals")
+                _write_index(index, path)
+
+        if dimension_changed:
+            # Embedding model changed: the existing vectors are not comparable any more
+            logger.warning(f"[User: {session.user_email}] Embedding dimension changed, rebuilding vector index.")
+            rebuild_user_index(session.user_email)
+            return
+
+        loaded_indexes.pop(path)
+
+    except Exception as e:
+        logger.error(f"[User: {session.user_email}] Error syncing vector index for session {session.id}: {e}")
+
+
+def stamp_user_index(user_email, previous_version, version):
+    """
+    After a user summary update commits, mark the local index as current for its new version if it
+    was current for the previous one: the sessions that changed were synced into it as they changed,
+    so it doesn't need a rebuild. An index that was already stale, or missing, is left for a rebuild.
+    """
+    try:
+        path = _index_path(user_email)
+        if not os.path.exists(f"{path}.version"):
+            return False
+        with _UserIndexLock(path):
+            if _read_version(path) != str(previous_version):
+                return False
+            _write_version(path, str(version))
+        index_stats.incr("stamps")
+        return True
+    except Exception as e:
+        logger.error(f"[User: {user_email}] Error stamping vector index version: {e}")
+        return False
+
+
+def schedule_rebuild(user_email, version=None):
+    """Rebuild a user's index on the background thread, unless a rebuild for them is already queued."""
+    with _pending_rebuilds_lock:
+        if user_email in _pending_rebuilds:
+            return
+        _pending_rebuilds.add(user_email)
+    rebuild_executor.submit(_run_rebuild, current_app._get_current_object(), user_email, version)
+
+
+def _run_rebuild(app, user_email, version):
+    try:
+        with app.app_context():
+            rebuild_user_index(user_email, version)
+    except Exception as e:
+        logger.error(f"[User: {user_email}] Background vector index rebuild failed: {e}")
+    finally:
+        with _pending_rebuilds_lock:
+            _pending_rebuilds.discard(user_email)
+
+
+def load_user_index(user_email, version=None):
+    """
+    Return the user's index, memory-mapped from disk. Reloads when another worker rewrote the file.
+    With version (the user summary's updated_at the caller already has), an index built for another
+    version, e.g. before a worker on another host finalized a session, counts as missing. A missing
+    index is built in the background and None is returned meanwhile, as it is for a user with no vectors.
+    """
+    path = _index_path(user_email)
+    built_for = _read_version(path)
+    if version is not None and built_for != str(version):
+        if built_for is not None or os.path.exists(path):
+            index_stats.incr("stale_rebuilds")
+        schedule_rebuild(user_email, version)
+        return None
+    if built_for is None and not os.path.exists(path):
+        schedule_rebuild(user_email)
+        return None
+
+    if not os.path.exists(path):
+        return None
+    return _load_index_file(path)
+
+
+def _load_index_file(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = loaded_indexes.get(path)
+    if cached is not None and cached[1] == mtime:
+        return cached[0]
+
+    index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    loaded_indexes.set(path, (index, mtime))
+    index_stats.incr("loads")
+    return index
+
+
+def search_user_sessions(user_email, embedding, k, version=None):
+    """
+    Find the user's k most similar sessions. Returns (session_ids, cosine scores) in descending
+    score order, or None when the user has no usable index yet. version: see load_user_index.
+    """
+    index = load_user_index(user_email, version)
+    if index is None or index.ntotal == 0:
+        return None
+
+    query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+    if query.shape[1] != index.d:
+        logger.warning(f"[User: {user_email}] Query dimension {query.shape[1]} does not match index dimension {index.d}")
+        return None
+
+    scores, ids = index.search(query, min(k, index.ntotal))
+    index_stats.incr("searches")
+    found = ids[0] >= 0
+    return ids[0][found], scores[0][found]
+
+
+def preload_indexes():
+    """
+    Memory-map every persisted index so the first request for each user doesn't pay for it.
+    """
+    if not os.path.isdir(index_dir):
+        return 0
+    count = 0
+    for name in os.listdir(index_dir):
+        if name.endswith(".faiss") and count < loaded_indexes.maxsize:
+            _load_index_file(os.path.join(index_dir, name))
+            count += 1
+    logger.info(f"Preloaded {count} vector indexes from {index_dir}")
+    return count
@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import request, jsonify
 import firebase_admin.auth
+from app.services.auth_service import verify_id_token_cached
 
 def authenticate(f):
     @wraps(f)
@@ -12,8 +13,8 @@ def authenticate(f):
         try:
             # Remove 'Bearer ' from the token
             token = auth_header.split(' ')[1]
-            # Verify the token
-            decoded_token = firebase_admin.auth.verify_id_token(token)
+            # Verify the token (claims are cached until the token expires)
+            decoded_token = verify_id_token_cached(token)
             user_email = decoded_token.get('email')
             
             if not user_email:
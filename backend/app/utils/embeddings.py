@@ -0,0 +1,44 @@
+import numpy as np
+import struct
+
+# Packed embedding matrix layout: uint32 count, uint32 dimension, int64 ids[count], float32 rows[count * dimension]
+_MATRIX_HEADER = struct.Struct("<II")
+
+def encode_embedding(embedding):
+    """
+    Pack an embedding (list or array) into float32 bytes for a LargeBinary column.
+    """
+    if embedding is None or len(embedding) == 0:
+        return None
+    return np.asarray(embedding, dtype="<f4").tobytes()
+
+def decode_embedding(blob):
+    """
+    Read float32 bytes back as a read-only array view over the buffer, without copying.
+    """
+    if not blob:
+        return None
+    return np.frombuffer(blob, dtype="<f4")
+
+def encode_embedding_matrix(ids, rows):
+    """
+    Pack session ids and their embeddings (all the same dimension) into one blob.
+    """
+    if not ids:
+        return None
+    matrix = np.asarray(rows, dtype="<f4")
+    header = _MATRIX_HEADER.pack(matrix.shape[0], matrix.shape[1])
+    return header + np.asarray(ids, dtype="<i8").tobytes() + matrix.tobytes()
+
+def decode_embedding_matrix(blob):
+    """
+    Unpack a blob from encode_embedding_matrix into (ids, matrix) views over the buffer, without copying.
+    """
+    if not blob:
+        return np.empty(0, dtype="<i8"), np.empty((0, 0), dtype="<f4")
+    count, dimension = _MATRIX_HEADER.unpack_from(blob)
+    ids = np.frombuffer(blob, dtype="<i8", count=count, offset=_MATRIX_HEADER.size)
+    matrix = np.frombuffer(
+        blob, dtype="<f4", count=count * dimension, offset=_MATRIX_HEADER.size + 8 * count
+    ).reshape(count, dimension)
+    return ids, matrix
@@ -0,0 +1,43 @@
+import threading
+
+# Registry of metric providers: name -> callable returning a dict of values
+_providers = {}
+_lock = threading.Lock()
+
+def register_metrics(name, provider):
+    """
+    Register a callable that reports a dict of metrics under the given name.
+    Registering the same name again replaces the previous provider.
+    """
+    with _lock:
+        _providers[name] = provider
+
+def get_metrics():
+    """
+    Collect a snapshot of every registered provider.
+    """
+    with _lock:
+        providers = dict(_providers)
+    return {name: provider() for name, provider in providers.items()}
+
+class Counters:
+    """
+    Named group of thread-safe counters, registered as a metrics provider.
+    """
+
+    def __init__(self, name, *counter_names):
+        self._lock = threading.Lock()
+        self._values = {counter: 0 for counter in counter_names}
+        register_metrics(name, self.snapshot)
+
+    def incr(self, counter, amount=1):
+        with self._lock:
+            self._values[counter] = self._values.get(counter, 0) + amount
+
+    def get(self, counter):
+        with self._lock:
+            return self._values.get(counter, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
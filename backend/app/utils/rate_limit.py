@@ -0,0 +1,60 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to `capacity` tokens and refills at `rate` tokens per second.
+    acquire() blocks until the requested amount is available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Take `amount` tokens, sleeping until they have refilled. Returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)  # A request larger than the bucket waits for a full one
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class RateLimiter:
+    """
+    Client-side limit on requests and tokens per minute, shared by the threads calling an API.
+    Either limit may be None (unlimited). Each bucket starts full, allowing a burst of one minute's budget.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens=0):
+        """Block until one request costing `tokens` tokens fits under both limits."""
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens and tokens:
+            waited += self.tokens.acquire(tokens)
+        with self._lock:
+            self.acquired += 1
+            self.waited_seconds += waited
+        return waited
+
+    def stats(self):
+        with self._lock:
+            return {"acquired": self.acquired, "waited_seconds": round(self.waited_seconds, 3)}
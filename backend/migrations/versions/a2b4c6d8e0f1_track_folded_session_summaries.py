@@ -0,0 +1,33 @@
+"""track folded session summaries
+
+Revision ID: a2b4c6d8e0f1
+Revises: f1a3c5e7b9d4
+Create Date: 2026-10-18 15:12:40.518273
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2b4c6d8e0f1'
+down_revision = 'f1a3c5e7b9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('chat_sessionv1', sa.Column('summary_folded_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_summaries', sa.Column('incremental_updates', sa.Integer(), nullable=False, server_default='0'))
+
+    # Existing user summaries were built from every summarized session, so those count as folded in
+    op.execute(
+        "UPDATE chat_sessionv1 SET summary_folded_at = now() "
+        "WHERE is_ended AND NOT is_archived AND NOT is_deleted AND summary IS NOT NULL AND summary <> '' "
+        "AND user_email IN (SELECT user_email FROM user_summaries)"
+    )
+
+
+def downgrade():
+    op.drop_column('user_summaries', 'incremental_updates')
+    op.drop_column('chat_sessionv1', 'summary_folded_at')
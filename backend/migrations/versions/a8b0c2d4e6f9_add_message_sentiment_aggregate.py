@@ -0,0 +1,30 @@
+"""add message sentiment aggregate
+
+Revision ID: a8b0c2d4e6f9
+Revises: f7a9b1c3d5e8
+Create Date: 2026-10-18 19:26:51.208734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8b0c2d4e6f9'
+down_revision = 'f7a9b1c3d5e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('chat_messages', sa.Column('sentiment_score', sa.Float(), nullable=True))
+    # Existing rows keep their whole-session score with an empty aggregate; the next scored
+    # message scores every unscored user message of its session and replaces it
+    op.add_column('session_sentiments', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('session_sentiments', sa.Column('score_sum', sa.Float(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('session_sentiments', 'score_sum')
+    op.drop_column('session_sentiments', 'message_count')
+    op.drop_column('chat_messages', 'sentiment_score')
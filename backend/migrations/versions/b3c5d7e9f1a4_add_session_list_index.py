@@ -0,0 +1,26 @@
+"""add session list index
+
+Revision ID: b3c5d7e9f1a4
+Revises: a2b4c6d8e0f1
+Create Date: 2026-10-18 15:58:03.227419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3c5d7e9f1a4'
+down_revision = 'a2b4c6d8e0f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves GET /sessions: one user's sessions, newest first, paged by (timestamp, id)
+    op.create_index('ix_chat_sessionv1_user_timestamp_id', 'chat_sessionv1',
+                    ['user_email', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_chat_sessionv1_user_timestamp_id', table_name='chat_sessionv1')
@@ -0,0 +1,30 @@
+"""add embedding cache
+
+Revision ID: b41c7e2d9f10
+Revises: a70d4fddcbd2
+Create Date: 2026-10-18 09:12:04.511203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41c7e2d9f10'
+down_revision = 'a70d4fddcbd2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('embedding_cache',
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('model', 'text_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('embedding_cache')
@@ -0,0 +1,24 @@
+"""add jobs finished_at index
+
+Revision ID: b9c1d3e5f7a0
+Revises: a8b0c2d4e6f9
+Create Date: 2026-10-18 20:04:13.582914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9c1d3e5f7a0'
+down_revision = 'a8b0c2d4e6f9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_jobs_status_finished_at', 'jobs', ['status', 'finished_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_status_finished_at', table_name='jobs')
@@ -0,0 +1,24 @@
+"""add embedding cache created_at index
+
+Revision ID: c0d2e4f6a8b1
+Revises: b9c1d3e5f7a0
+Create Date: 2026-10-18 20:31:08.417395
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0d2e4f6a8b1'
+down_revision = 'b9c1d3e5f7a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_embedding_cache_created_at', 'embedding_cache', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_embedding_cache_created_at', table_name='embedding_cache')
@@ -0,0 +1,26 @@
+"""add session sentiments user index
+
+Revision ID: c4d6e8f0a2b5
+Revises: b3c5d7e9f1a4
+Create Date: 2026-10-18 16:31:17.604928
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d6e8f0a2b5'
+down_revision = 'b3c5d7e9f1a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves GET /user_sentiments, which filters on user_email before joining to the sessions
+    op.create_index('ix_session_sentiments_user_email_session_id', 'session_sentiments',
+                    ['user_email', 'session_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_session_sentiments_user_email_session_id', table_name='session_sentiments')
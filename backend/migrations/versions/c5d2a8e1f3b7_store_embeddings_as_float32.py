@@ -0,0 +1,118 @@
+"""store embeddings as float32 blobs
+
+Revision ID: c5d2a8e1f3b7
+Revises: b41c7e2d9f10
+Create Date: 2026-10-18 10:41:27.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+import struct
+import json
+import logging
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2a8e1f3b7'
+down_revision = 'b41c7e2d9f10'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 500
+
+# Same layout as app.utils.embeddings: uint32 count, uint32 dimension, int64 ids, float32 rows
+MATRIX_HEADER = struct.Struct("<II")
+
+
+def _vector_to_blob(text):
+    values = json.loads(text)
+    if not values:
+        return None
+    return np.asarray(values, dtype="<f4").tobytes()
+
+
+def _blob_to_vector(blob):
+    return json.dumps(np.frombuffer(blob, dtype="<f4").tolist())
+
+
+def _map_to_blob(text):
+    embeddings = json.loads(text)
+    ids = []
+    rows = []
+    for session_id, values in embeddings.items():
+        if not values or (rows and len(values) != rows[0].shape[0]):
+            continue
+        ids.append(int(session_id))
+        rows.append(np.asarray(values, dtype="<f4"))
+    if not ids:
+        return None
+    matrix = np.vstack(rows)
+    header = MATRIX_HEADER.pack(matrix.shape[0], matrix.shape[1])
+    return header + np.asarray(ids, dtype="<i8").tobytes() + matrix.tobytes()
+
+
+def _blob_to_map(blob):
+    count, dimension = MATRIX_HEADER.unpack_from(blob)
+    ids = np.frombuffer(blob, dtype="<i8", count=count, offset=MATRIX_HEADER.size)
+    matrix = np.frombuffer(blob, dtype="<f4", count=count * dimension,
+                           offset=MATRIX_HEADER.size + 8 * count).reshape(count, dimension)
+    return json.dumps({str(session_id): row.tolist() for session_id, row in zip(ids, matrix)})
+
+
+def _convert_column(table, column, new_type, convert, key='id'):
+    """
+    Add a temporary column, backfill it in batches of BATCH_SIZE rows, then swap it in for the old one.
+    """
+    connection = op.get_bind()
+    temp_column = f"{column}_converted"
+    op.add_column(table, sa.Column(temp_column, new_type, nullable=True))
+
+    old_bytes = 0
+    new_bytes = 0
+    converted = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(f"SELECT {key}, {column} FROM {table} WHERE {column} IS NOT NULL AND {key} > :last_id "
+                    f"ORDER BY {key} LIMIT :batch_size"),
+            {"last_id": last_id, "batch_size": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, value in rows:
+            try:
+                new_value = convert(value)
+            except (ValueError, TypeError, struct.error) as e:
+                logger.warning(f"{table}.{column}: could not convert row {row_id} ({e}), leaving it NULL")
+                new_value = None
+            old_bytes += len(value)
+            new_bytes += len(new_value) if new_value is not None else 0
+            updates.append({"row_id": row_id, "new_value": new_value})
+
+        connection.execute(
+            sa.text(f"UPDATE {table} SET {temp_column} = :new_value WHERE {key} = :row_id"),
+            updates
+        )
+        converted += len(rows)
+        last_id = rows[-1][0]
+        logger.info(f"{table}.{column}: converted {converted} rows")
+
+    op.drop_column(table, column)
+    op.alter_column(table, temp_column, new_column_name=column)
+    logger.info(f"{table}.{column}: {converted} rows, {old_bytes} bytes -> {new_bytes} bytes")
+
+
+def upgrade():
+    _convert_column('chat_sessionv1', 'embedding', sa.LargeBinary(), _vector_to_blob)
+    _convert_column('user_summaries', 'session_embeddings', sa.LargeBinary(), _map_to_blob)
+    # Cached vectors were already float32; nothing to convert in embedding_cache
+
+
+def downgrade():
+    _convert_column('user_summaries', 'session_embeddings', sa.Text(), _blob_to_map)
+    _convert_column('chat_sessionv1', 'embedding', sa.Text(), _blob_to_vector)
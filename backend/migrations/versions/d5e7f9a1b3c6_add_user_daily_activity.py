@@ -0,0 +1,36 @@
+"""add user daily activity
+
+Revision ID: d5e7f9a1b3c6
+Revises: c4d6e8f0a2b5
+Create Date: 2026-10-18 17:05:42.371906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e7f9a1b3c6'
+down_revision = 'c4d6e8f0a2b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_daily_activity',
+    sa.Column('user_email', sa.String(length=120), nullable=False),
+    sa.Column('activity_date', sa.Date(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_email', 'activity_date')
+    )
+
+    # Roll up existing sessions by UTC day
+    op.execute(
+        "INSERT INTO user_daily_activity (user_email, activity_date, session_count) "
+        "SELECT user_email, (timestamp AT TIME ZONE 'UTC')::date, count(*) FROM chat_sessionv1 "
+        "WHERE NOT is_deleted AND timestamp IS NOT NULL GROUP BY 1, 2"
+    )
+
+
+def downgrade():
+    op.drop_table('user_daily_activity')
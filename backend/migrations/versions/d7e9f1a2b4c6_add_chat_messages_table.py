@@ -0,0 +1,126 @@
+"""add chat messages table
+
+Revision ID: d7e9f1a2b4c6
+Revises: c5d2a8e1f3b7
+Create Date: 2026-10-18 12:05:51.330846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+import logging
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e9f1a2b4c6'
+down_revision = 'c5d2a8e1f3b7'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 200
+
+chat_messages = sa.table('chat_messages',
+    sa.column('session_id', sa.Integer),
+    sa.column('seq', sa.Integer),
+    sa.column('role', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('created_at', sa.DateTime(timezone=True))
+)
+
+
+def upgrade():
+    op.create_table('chat_messages',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['chat_sessionv1.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'seq', name='uq_chat_messages_session_seq')
+    )
+    op.add_column('chat_sessionv1', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Move each session's JSON blob into rows, BATCH_SIZE sessions at a time
+    connection = op.get_bind()
+    last_id = 0
+    moved_sessions = 0
+    moved_messages = 0
+    while True:
+        sessions = connection.execute(
+            sa.text("SELECT id, messages, timestamp FROM chat_sessionv1 WHERE id > :last_id ORDER BY id LIMIT :batch_size"),
+            {"last_id": last_id, "batch_size": BATCH_SIZE}
+        ).fetchall()
+        if not sessions:
+            break
+
+        rows = []
+        counts = []
+        for session_id, messages, timestamp in sessions:
+            try:
+                parsed = json.loads(messages) if messages else []
+            except (ValueError, TypeError):
+                logger.warning(f"chat_sessionv1 {session_id}: unreadable messages, skipping")
+                parsed = []
+            seq = 0
+            for message in parsed:
+                if not isinstance(message, dict) or not message.get('role'):
+                    continue
+                seq += 1
+                rows.append({
+                    'session_id': session_id,
+                    'seq': seq,
+                    'role': message['role'],
+                    'content': message.get('content') or '',
+                    'created_at': timestamp
+                })
+            counts.append({'session_id': session_id, 'message_count': seq})
+
+        if rows:
+            op.bulk_insert(chat_messages, rows)
+        connection.execute(
+            sa.text("UPDATE chat_sessionv1 SET message_count = :message_count WHERE id = :session_id"),
+            counts
+        )
+        moved_sessions += len(sessions)
+        moved_messages += len(rows)
+        last_id = sessions[-1][0]
+        logger.info(f"chat_messages: moved {moved_messages} messages from {moved_sessions} sessions")
+
+    op.drop_column('chat_sessionv1', 'messages')
+
+
+def downgrade():
+    op.add_column('chat_sessionv1', sa.Column('messages', sa.Text(), nullable=False, server_default='[]'))
+
+    # Rebuild the JSON blobs from the rows, BATCH_SIZE sessions at a time
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        session_ids = [row[0] for row in connection.execute(
+            sa.text("SELECT id FROM chat_sessionv1 WHERE id > :last_id ORDER BY id LIMIT :batch_size"),
+            {"last_id": last_id, "batch_size": BATCH_SIZE}
+        ).fetchall()]
+        if not session_ids:
+            break
+
+        messages_by_session = {session_id: [] for session_id in session_ids}
+        for session_id, role, content in connection.execute(
+            sa.text("SELECT session_id, role, content FROM chat_messages WHERE session_id = ANY(:session_ids) "
+                    "ORDER BY session_id, seq"),
+            {"session_ids": session_ids}
+        ):
+            messages_by_session[session_id].append({"role": role, "content": content})
+
+        connection.execute(
+            sa.text("UPDATE chat_sessionv1 SET messages = :messages WHERE id = :session_id"),
+            [{"session_id": session_id, "messages": json.dumps(messages)}
+             for session_id, messages in messages_by_session.items()]
+        )
+        last_id = session_ids[-1]
+
+    op.drop_column('chat_sessionv1', 'message_count')
+    op.drop_table('chat_messages')
@@ -0,0 +1,61 @@
+"""add chat message token count
+
+Revision ID: e3f5a7c9d1b2
+Revises: d7e9f1a2b4c6
+Create Date: 2026-10-18 13:22:09.184562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+import os
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f5a7c9d1b2'
+down_revision = 'd7e9f1a2b4c6'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 1000
+
+
+def _token_counter():
+    """Same tokenizer choice as app.services.token_budget, with its character estimate as fallback."""
+    try:
+        from tiktoken import encoding_for_model
+        encoder = encoding_for_model(os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+        return lambda text: len(encoder.encode(text or "", disallowed_special=()))
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer, estimating token counts instead: {e}")
+        return lambda text: -(-len(text or "") // 4)
+
+
+def upgrade():
+    op.add_column('chat_messages', sa.Column('token_count', sa.Integer(), nullable=True))
+
+    # Count existing messages once, in batches
+    connection = op.get_bind()
+    count_tokens = _token_counter()
+    last_id = 0
+    counted = 0
+    while True:
+        rows = connection.execute(
+            sa.text("SELECT id, content FROM chat_messages WHERE id > :last_id ORDER BY id LIMIT :batch_size"),
+            {"last_id": last_id, "batch_size": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            sa.text("UPDATE chat_messages SET token_count = :token_count WHERE id = :message_id"),
+            [{"message_id": message_id, "token_count": count_tokens(content)} for message_id, content in rows]
+        )
+        counted += len(rows)
+        last_id = rows[-1][0]
+        logger.info(f"chat_messages: counted tokens for {counted} messages")
+
+
+def downgrade():
+    op.drop_column('chat_messages', 'token_count')
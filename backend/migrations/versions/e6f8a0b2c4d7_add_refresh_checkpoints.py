@@ -0,0 +1,29 @@
+"""add refresh checkpoints
+
+Revision ID: e6f8a0b2c4d7
+Revises: d5e7f9a1b3c6
+Create Date: 2026-10-18 18:12:37.540218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f8a0b2c4d7'
+down_revision = 'd5e7f9a1b3c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('refresh_checkpoints',
+    sa.Column('run_name', sa.String(length=100), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('run_name', 'session_id')
+    )
+
+
+def downgrade():
+    op.drop_table('refresh_checkpoints')
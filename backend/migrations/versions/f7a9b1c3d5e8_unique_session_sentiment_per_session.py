@@ -0,0 +1,32 @@
+"""unique session sentiment per session
+
+Revision ID: f7a9b1c3d5e8
+Revises: e6f8a0b2c4d7
+Create Date: 2026-10-18 18:48:03.915327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a9b1c3d5e8'
+down_revision = 'e6f8a0b2c4d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every rescore used to insert another row; keep only the latest one per session
+    op.execute(
+        "DELETE FROM session_sentiments WHERE id IN ("
+        "SELECT id FROM (SELECT id, row_number() OVER ("
+        "PARTITION BY session_id ORDER BY updated_at DESC NULLS LAST, id DESC) AS rank "
+        "FROM session_sentiments) ranked WHERE rank > 1)"
+    )
+    # Conflict target for the INSERT ... ON CONFLICT (session_id) upserts
+    op.create_index('uq_session_sentiments_session_id', 'session_sentiments', ['session_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_session_sentiments_session_id', table_name='session_sentiments')
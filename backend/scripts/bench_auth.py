@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import auth_service
+from app.utils.decorators import authenticate
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from datetime import datetime, timezone, timedelta
+from flask import Flask, jsonify
+from google.auth import crypt, jwt
+import argparse
+import firebase_admin.auth
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+PROJECT_ID = "bench-project"
+
+def make_signer():
+    """An RSA key and self-signed certificate standing in for Google's token signing keys."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.now(timezone.utc)
+    certificate = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        key.public_key()
+    ).serial_number(1).not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1)).sign(
+        key, hashes.SHA256()
+    )
+    pem_key = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    signer = crypt.RSASigner.from_string(pem_key, key_id="bench")
+    certs = {"bench": certificate.public_bytes(serialization.Encoding.PEM).decode("ascii")}
+    return signer, certs
+
+def install_verifier(certs):
+    """Verify tokens the way firebase_admin does (RS256 signature and claims), minus the cert fetch."""
+    def verify_id_token(token, **kwargs):
+        return jwt.decode(token, certs=certs, audience=PROJECT_ID)
+    firebase_admin.auth.verify_id_token = verify_id_token
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    @authenticate
+    def ping(user_email):
+        return jsonify({"user": user_email})
+
+    return app
+
+def time_requests(client, token, count, clear_cache):
+    headers = {"Authorization": f"Bearer {token}"}
+    started_at = time.perf_counter()
+    for _ in range(count):
+        if clear_cache:
+            auth_service.token_cache.clear()
+        response = client.get('/ping', headers=headers)
+        assert response.status_code == 200, response.get_json()
+    return (time.perf_counter() - started_at) / count
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark authenticate overhead: verify every request vs cached claims')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per variant')
+    args = parser.parse_args()
+
+    signer, certs = make_signer()
+    install_verifier(certs)
+
+    now = int(time.time())
+    token = jwt.encode(signer, {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}", "aud": PROJECT_ID, "sub": "bench-user",
+        "email": "bench@example.invalid", "iat": now, "exp": now + 3600
+    }).decode("ascii")
+
+    client = make_app().test_client()
+    time_requests(client, token, 50, clear_cache=True)  # Warm up
+
+    before = time_requests(client, token, args.requests, clear_cache=True)
+    auth_service.token_cache.clear()
+    after = time_requests(client, token, args.requests, clear_cache=False)
+
+    print(f"verify every request: {before * 1e6:8.1f} us/request")
+    print(f"cached claims:        {after * 1e6:8.1f} us/request")
+    print(f"saved per request:    {(before - after) * 1e6:8.1f} us")
+    print(f"auth metrics: {auth_service.token_stats.snapshot()}")
+
+if __name__ == "__main__":
+    main()
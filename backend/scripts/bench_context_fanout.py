@@ -0,0 +1,121 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from types import SimpleNamespace
+import app.services.ai_service as ai_service
+from app.services.catalog import assistant_catalog, goal_catalog
+from app.utils.embeddings import encode_embedding_matrix
+import argparse
+import logging
+import statistics
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+class StubCompletions:
+    """Stands in for client.chat.completions with a fixed latency per call."""
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        message = SimpleNamespace(content="Stubbed completion.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+class StubEmbeddings:
+    """Stands in for client.embeddings with a fixed latency per call."""
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0] + [0.0] * 1535)])
+
+class StubQuery:
+    """Minimal query object so the context stages can run without a database."""
+    def __init__(self, result):
+        self.result = result
+
+    def filter_by(self, **kwargs):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def first(self):
+        return self.result
+
+def install_stubs(completion_latency, embedding_latency):
+    """Swap the OpenAI client and the DB lookups used by createContext for stubs."""
+    ai_service.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=StubCompletions(completion_latency)),
+        embeddings=StubEmbeddings(embedding_latency)
+    )
+
+    embedding = [1.0] + [0.0] * 1535
+    user_summary = SimpleNamespace(
+        summary="The user journals about work stress and their running goals.",
+        session_summaries=ai_service.json.dumps([
+            {"session_id": 1, "summary": "Talked about a marathon plan."},
+            {"session_id": 2, "summary": "Talked about a deadline at work."}
+        ]),
+        session_embeddings=encode_embedding_matrix([1, 2], [embedding, embedding]),
+        updated_at=None
+    )
+    recent_session = SimpleNamespace(
+        get_messages=lambda: [{"role": "user", "content": "I finally ran 10k today."}]
+    )
+    ai_service.UserSummary = SimpleNamespace(query=StubQuery(user_summary))
+    # No vector index without a database; retrieval takes the in-memory matrix path
+    ai_service.search_user_sessions = lambda *args, **kwargs: None
+    ai_service.ChatSession = SimpleNamespace(
+        query=StubQuery(recent_session),
+        timestamp=SimpleNamespace(desc=lambda: None)
+    )
+    # Empty assistant and goal catalogs, so getSystemPrompt builds the base prompt instead of failing on the DB
+    for catalog in (assistant_catalog, goal_catalog):
+        catalog._ensure_loaded = lambda: ({}, "bench")
+
+def time_create_context(messages, runs):
+    timings = []
+    for _ in range(runs):
+        # Measure cold stages, not cache hits
+        ai_service.trimmed_summary_cache.clear()
+        ai_service.embedding_cache.clear()
+        ai_service.session_matrix_cache.clear()
+        started_at = time.perf_counter()
+        ai_service.createContext(messages, "bench@example.com", None, None)
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark createContext sequential vs concurrent enrichment')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per mode')
+    parser.add_argument('--completion-latency', type=float, default=0.3, help='Stubbed chat completion latency (s)')
+    parser.add_argument('--embedding-latency', type=float, default=0.1, help='Stubbed embedding latency (s)')
+    args = parser.parse_args()
+
+    install_stubs(args.completion_latency, args.embedding_latency)
+
+    # First message of a session exercises all three stages
+    messages = []
+    slowest_stage = args.completion_latency + args.embedding_latency
+    stage_sum = 3 * args.completion_latency + args.embedding_latency
+
+    app = Flask(__name__)
+    with app.app_context():
+        for fanout in (False, True):
+            ai_service.contextFanoutEnabled = fanout
+            timings = time_create_context(messages, args.runs)
+            mode = "concurrent" if fanout else "sequential"
+            print(f"{mode:>10}: median {statistics.median(timings):.3f}s  "
+                  f"min {min(timings):.3f}s  max {max(timings):.3f}s")
+
+    print(f"expected:  sum of stages {stage_sum:.3f}s, slowest stage {slowest_stage:.3f}s")
+
+if __name__ == "__main__":
+    main()
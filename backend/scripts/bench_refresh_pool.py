@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from types import SimpleNamespace
+import app.services.ai_service as ai_service
+from app.utils.rate_limit import RateLimiter
+from refresh_summaries import summarize_concurrently
+import argparse
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR, force=True)  # refresh_summaries configures INFO on import
+logger = logging.getLogger(__name__)
+
+class StubCompletions:
+    """Stands in for client.chat.completions with a fixed latency per call."""
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        message = SimpleNamespace(content="Stubbed session summary.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+def load_messages(session_id):
+    """Synthetic session in place of the database; token counts are preset so no tokenizer is needed."""
+    return [
+        {"role": "user", "content": f"Session {session_id}: how my week went.", "token_count": 400},
+        {"role": "assistant", "content": "Tell me more about that.", "token_count": 100}
+    ]
+
+def run(sessions, workers, rate_limiter):
+    rows = (SimpleNamespace(id=session_id, user_email="bench@example.com") for session_id in range(sessions))
+    started_at = time.perf_counter()
+    done = sum(1 for _ in summarize_concurrently(rows, load_messages, workers=workers, rate_limiter=rate_limiter))
+    return done, time.perf_counter() - started_at
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Dry-run benchmark of the refresh_summaries worker pool against a stub LLM '
+                    '(no database or API calls)'
+    )
+    parser.add_argument('--sessions', type=int, default=200, help='Sessions to summarize per run')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help='Worker counts to try')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stubbed completion latency (s)')
+    parser.add_argument('--rpm', type=int, default=3000, help='Requests per minute limit (0 for none)')
+    parser.add_argument('--tpm', type=int, default=0, help='Tokens per minute limit (0 for none)')
+    args = parser.parse_args()
+
+    ai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(args.latency)))
+
+    # Each request reserves its prompt tokens (500 + per-message overhead) plus the completion limit
+    tokens_per_request = 500 + 2 * 4 + ai_service.sessionSummaryMaxTokens
+    limits = []
+    if args.rpm:
+        limits.append(args.rpm / 60)
+    if args.tpm:
+        limits.append(args.tpm / 60 / tokens_per_request)
+    ceiling = min(limits) if limits else None
+
+    print(f"{'workers':>7} {'sessions/s':>11} {'ideal':>8} {'rate-limited waits (s)':>23}")
+    for workers in args.workers:
+        # Fresh, empty buckets, so the initial one-minute burst doesn't hide the steady-state rate
+        rate_limiter = RateLimiter(args.rpm or None, args.tpm or None)
+        for bucket in (rate_limiter.requests, rate_limiter.tokens):
+            if bucket:
+                bucket._tokens = 0
+        done, elapsed = run(args.sessions, workers, rate_limiter)
+        ideal = workers / args.latency if ceiling is None else min(workers / args.latency, ceiling)
+        print(f"{workers:>7} {done / elapsed:>11.1f} {ideal:>8.1f} {rate_limiter.stats()['waited_seconds']:>23.1f}")
+
+    if ceiling is not None:
+        print(f"rate limit ceiling: {ceiling:.1f} sessions/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.__init__ import create_app, db
+from app.models.chat_session import ChatSession
+from app.services.catalog import assistant_catalog
+from sqlalchemy import event
+import argparse
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+BENCH_USER = "bench-session-queries@example.invalid"
+
+class StatementCounter:
+    """Counts SQL statements sent to the database while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+def list_page():
+    """What GET /sessions runs: one projected query, plus the assistant catalog if it's cold."""
+    return ChatSession.list_page(BENCH_USER)
+
+def list_full_sessions():
+    """The old listing: full ORM rows serialized one by one (messages, embedding)."""
+    sessions = ChatSession.query.filter_by(
+        user_email=BENCH_USER,
+        is_deleted=False
+    ).order_by(ChatSession.timestamp.desc()).all()
+    return [s.to_dict() for s in sessions]
+
+def count_statements(listing):
+    db.session.expunge_all()  # Start from an empty identity map, like a fresh request
+    with StatementCounter(db.engine) as counter:
+        listing()
+    return counter.count
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Count SQL statements for GET /sessions serialization. Runs inside a transaction '
+                    'that is rolled back, so nothing is written to the database.'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100], help='Sessions to list')
+    parser.add_argument('--assistant-id', type=int, default=1, help='Assistant for the generated sessions')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        results = []
+        try:
+            created = 0
+            for size in sorted(args.sizes):
+                while created < size:
+                    session = ChatSession(user_email=BENCH_USER, title=f"Bench {created}", summary="",
+                                          assistant_id=args.assistant_id, goal_ids=[1])
+                    db.session.add(session)
+                    db.session.flush()
+                    session.append_messages([{"role": "user", "content": "hello"},
+                                             {"role": "assistant", "content": "hi"}])
+                    created += 1
+                db.session.flush()
+
+                assistant_catalog.invalidate()
+                cold = count_statements(list_page)
+                warm = count_statements(list_page)
+                per_session = count_statements(list_full_sessions)
+                results.append((size, cold, warm, per_session))
+        finally:
+            db.session.rollback()
+
+    print(f"{'sessions':>8} {'list_page (cold catalog)':>25} {'list_page (warm)':>17} {'to_dict per session':>20}")
+    for size, cold, warm, per_session in results:
+        print(f"{size:>8} {cold:>25} {warm:>17} {per_session:>20}")
+
+    # Batched listing must not grow with the number of sessions
+    if len({warm for _, _, warm, _ in results}) > 1 or len({cold for _, cold, _, _ in results}) > 1:
+        print("FAIL: statement count grows with the number of sessions")
+        sys.exit(1)
+    print("OK: constant statement count")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes.chat_routes import _activity_stats
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+import argparse
+import logging
+import random
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+def legacy_stats(sessions, today):
+    """The per-session loops get_session_stats ran before the user_daily_activity rollup."""
+    contributions = {}
+    for session in sessions:
+        date_str = session.timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        utc_date = session.timestamp.strftime('%Y-%m-%d')
+        year = session.timestamp.year
+        if year not in contributions:
+            contributions[year] = {}
+        if utc_date not in contributions[year]:
+            contributions[year][utc_date] = {'count': 0, 'timestamps': []}
+        contributions[year][utc_date]['count'] += 1
+        contributions[year][utc_date]['timestamps'].append(date_str)
+
+    current_date = today
+    daily_streak = 0
+    while True:
+        date_str = current_date.strftime('%Y-%m-%d')
+        if not contributions.get(current_date.year, {}).get(date_str):
+            break
+        daily_streak += 1
+        current_date = current_date - timedelta(days=1)
+
+    current_date = today
+    weekly_streak = 0
+    current_week = current_date.isocalendar()[1]
+    current_year = current_date.year
+    while True:
+        has_sessions = False
+        for session in sessions:
+            if (session.timestamp.isocalendar()[1] == current_week and
+                    session.timestamp.year == current_year):
+                has_sessions = True
+                break
+        if not has_sessions:
+            break
+        weekly_streak += 1
+        current_week -= 1
+        if current_week == 0:
+            current_year -= 1
+            current_week = datetime(current_year, 12, 28).isocalendar()[1]
+
+    current_date = today
+    monthly_streak = 0
+    while True:
+        has_sessions = False
+        for session in sessions:
+            if (session.timestamp.month == current_date.month and
+                    session.timestamp.year == current_date.year):
+                has_sessions = True
+                break
+        if not has_sessions:
+            break
+        monthly_streak += 1
+        current_date = current_date.replace(day=1) - timedelta(days=1)
+
+    return {'contributions': contributions,
+            'streaks': {'daily': daily_streak, 'weekly': weekly_streak, 'monthly': monthly_streak}}
+
+def time_call(func, repeat):
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started_at) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /sessions/stats: per-session loops vs the daily rollup')
+    parser.add_argument('--sessions', type=int, default=5000, help='Sessions for the user')
+    parser.add_argument('--days', type=int, default=1000, help='Days of history the sessions are spread over')
+    parser.add_argument('--streak-days', type=int, default=120, help='Consecutive active days up to today')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per variant')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+    offsets = list(range(args.streak_days)) + [rng.randrange(args.days) for _ in range(args.sessions - args.streak_days)]
+    sessions = [SimpleNamespace(timestamp=now - timedelta(days=offset, minutes=rng.randrange(600)))
+                for offset in offsets]
+    sessions.sort(key=lambda session: session.timestamp, reverse=True)
+
+    # What the rollup holds for this user: one row per active day
+    daily_counts = Counter(session.timestamp.date() for session in sessions)
+
+    legacy_seconds, legacy = time_call(lambda: legacy_stats(sessions, now), args.repeat)
+    rollup_seconds, rollup = time_call(lambda: _activity_stats(daily_counts, now.date()), args.repeat)
+
+    print(f"sessions: {len(sessions)}, rows loaded: legacy {len(sessions)}, rollup {len(daily_counts)}")
+    print(f"legacy loops: {legacy_seconds * 1000:9.2f} ms  streaks {legacy['streaks']}")
+    print(f"daily rollup: {rollup_seconds * 1000:9.2f} ms  streaks {rollup['streaks']}")
+    print(f"speedup: {legacy_seconds / rollup_seconds:.0f}x")
+
+if __name__ == "__main__":
+    main()
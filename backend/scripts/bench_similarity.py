@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ai_service import build_session_matrix, score_session_matrix, rank_relevant_sessions
+from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+import argparse
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+def legacy_rank(current_embedding, session_summaries, session_embeddings, min_n, max_n, similarity_threshold):
+    """The per-session cosine_similarity loop get_most_relevant_context used before vectorizing."""
+    similarity_scores = []
+    for session in session_summaries:
+        session_id = str(session['session_id'])
+        if session_id in session_embeddings:
+            session_embedding = np.array(session_embeddings[session_id]).reshape(1, -1)
+            score = cosine_similarity([current_embedding], session_embedding)[0][0]
+            similarity_scores.append((score, session))
+
+    similarity_scores.sort(reverse=True, key=lambda x: x[0])
+    relevant_sessions = [s[1] for s in similarity_scores[:min_n]]
+    for score, session in similarity_scores[min_n:]:
+        if score >= similarity_threshold and len(relevant_sessions) < max_n:
+            relevant_sessions.append(session)
+    return relevant_sessions
+
+def time_call(func, repeat):
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started_at) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark session similarity scoring')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help='Session counts')
+    parser.add_argument('--dim', type=int, default=1536, help='Embedding dimension')
+    parser.add_argument('--repeat', type=int, default=5, help='Queries per size')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    min_n, max_n, threshold = 2, 5, 0.05
+
+    print(f"{'sessions':>8} {'legacy loop':>12} {'matrix build':>13} {'vectorized':>11} {'speedup':>8}  same result")
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, args.dim)).astype(np.float32)
+        session_summaries = [{"session_id": i, "summary": f"Session {i}"} for i in range(size)]
+        session_embeddings = {str(i): vectors[i].tolist() for i in range(size)}
+        current_embedding = rng.standard_normal(args.dim).tolist()
+
+        legacy_time, legacy_result = time_call(
+            lambda: legacy_rank(current_embedding, session_summaries, session_embeddings, min_n, max_n, threshold),
+            args.repeat
+        )
+        build_time, (candidates, matrix, norms) = time_call(
+            lambda: build_session_matrix("bench@example.com", session_summaries, session_embeddings),
+            1
+        )
+        query = np.asarray(current_embedding, dtype=np.float32)
+        vector_time, ranked = time_call(
+            lambda: rank_relevant_sessions(score_session_matrix(matrix, norms, query), min_n, max_n, threshold),
+            args.repeat
+        )
+
+        same = [s["session_id"] for s in legacy_result] == [candidates[i]["session_id"] for i in ranked]
+        print(f"{size:>8} {legacy_time * 1000:>10.2f}ms {build_time * 1000:>11.2f}ms "
+              f"{vector_time * 1000:>9.3f}ms {legacy_time / vector_time:>7.0f}x  {same}")
+
+if __name__ == "__main__":
+    main()
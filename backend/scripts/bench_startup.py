@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import tempfile
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet runs in a fresh interpreter and prints its own elapsed seconds
+SNIPPETS = {
+    "import ai_service": (
+        "import time; t = time.perf_counter()\n"
+        "import app.services.ai_service\n"
+        "print(time.perf_counter() - t)"
+    ),
+    "create_app()": (
+        "import time; t = time.perf_counter()\n"
+        "from app.__init__ import create_app\n"
+        "create_app()\n"
+        "print(time.perf_counter() - t)"
+    ),
+    "first analyze_sentiment": (
+        "import app.services.ai_service as ai_service, time; t = time.perf_counter()\n"
+        "ai_service.analyze_sentiment('I had a good day')\n"
+        "print(time.perf_counter() - t)"
+    ),
+}
+
+def write_service_account(directory):
+    """create_app loads serviceAccountKey.json from the working directory; write a throwaway one."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode("ascii")
+    with open(os.path.join(directory, "serviceAccountKey.json"), "w") as f:
+        json.dump({
+            "type": "service_account", "project_id": "bench-project", "private_key_id": "bench",
+            "private_key": pem, "client_email": "bench@bench-project.iam.gserviceaccount.com",
+            "client_id": "0", "token_uri": "https://oauth2.googleapis.com/token"
+        }, f)
+
+def run_snippet(code, cwd, env):
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure backend startup: module import, create_app() and lazy sentiment load')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per measurement')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env.setdefault("DATABASE_URL", "postgresql://bench@localhost/bench")  # The engine connects lazily
+
+    with tempfile.TemporaryDirectory() as cwd:
+        write_service_account(cwd)
+        print(f"{'step':<26} {'median':>9} {'min':>9} {'max':>9}")
+        for name, code in SNIPPETS.items():
+            try:
+                timings = [run_snippet(code, cwd, env) for _ in range(args.repeat)]
+            except RuntimeError as e:
+                print(f"{name:<26} failed: {e}")
+                continue
+            print(f"{name:<26} {statistics.median(timings) * 1000:7.0f}ms {min(timings) * 1000:7.0f}ms "
+                  f"{max(timings) * 1000:7.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import ai_service
+from app.services.token_budget import count_tokens
+from types import SimpleNamespace
+import argparse
+import logging
+import random
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+WORDS = ("work family sleep anxiety running friend project deadline gratitude walk music move "
+         "sister budget exercise focus habit weekend travel stress journal goal therapy").split()
+
+class StubCompletions:
+    """Stands in for the OpenAI API: reports prompt tokens and returns a summary of fixed size."""
+
+    def __init__(self, summary):
+        self.summary = summary
+
+    def create(self, model, messages, max_tokens=None, **kwargs):
+        prompt_tokens = sum(count_tokens(m["content"], model) for m in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.summary))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=count_tokens(self.summary, model))
+        )
+
+def fake_summary(rng, words=120):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def prompt_tokens_for(mode, call):
+    before = ai_service.user_summary_stats.get(f"{mode}_prompt_tokens")
+    call()
+    return ai_service.user_summary_stats.get(f"{mode}_prompt_tokens") - before
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare user summary prompt size: full rebuild vs incremental fold')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200, 1000], help='Sessions in the user history')
+    parser.add_argument('--new', type=int, default=1, help='New sessions per update')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    previous_summary = fake_summary(rng, 400)
+    ai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(previous_summary)))
+
+    print(f"{'sessions':>8} {'full prompt tokens':>19} {'incremental prompt tokens':>26}")
+    for size in args.sizes:
+        history = [fake_summary(rng) for _ in range(size)]
+        new_sessions = history[:args.new]
+
+        full = prompt_tokens_for("full", lambda: ai_service.generateUserSummary(
+            history, previous_summary=previous_summary))
+        incremental = prompt_tokens_for("incremental", lambda: ai_service.generateUserSummary(
+            new_sessions, previous_summary=previous_summary, incremental=True))
+        print(f"{size:>8} {full:>19} {incremental:>26}")
+
+    print(f"\nuser_summary metrics: {ai_service.user_summary_stats.snapshot()}")
+
+if __name__ == "__main__":
+    main()
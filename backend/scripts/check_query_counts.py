@@ -0,0 +1,146 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from app.__init__ import db
+from app.models.assistant import Assistant
+from app.models.goals import Goals
+from app.models.chat_session import ChatSession
+from app.models.chat_message import ChatMessage
+from app.services.catalog import assistant_catalog
+from app.routes.chat_routes import get_sessions, get_session_messages
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+import argparse
+import json
+import logging
+import sqlite3
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR, force=True)
+logger = logging.getLogger(__name__)
+
+CHECK_USER = "check-query-counts@example.invalid"
+
+# Statements each handler may send, whatever the number of sessions or messages
+QUERY_BUDGETS = {
+    "GET /sessions (cold catalog)": 2,  # Projected session query + assistant catalog load
+    "GET /sessions": 1,
+    "GET /sessions?limit=20": 1,
+    "GET /sessions/<id>": 2,  # Session row + its messages
+    "GET /sessions/<id>?limit=20": 2
+}
+
+# Postgres ARRAY columns as JSON text, so the schema runs on an in-memory SQLite database
+@compiles(ARRAY, "sqlite")
+def _array_as_json(element, compiler, **kw):
+    return "INT_ARRAY"
+
+sqlite3.register_adapter(list, json.dumps)
+sqlite3.register_converter("INT_ARRAY", json.loads)
+
+class StatementCounter:
+    """Counts SQL statements sent to the database while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+def create_check_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES}
+    }
+    db.init_app(app)
+    return app
+
+def seed(session_count, messages_per_session):
+    """Add sessions (with messages) for the check user until they have session_count; returns one session id."""
+    existing = ChatSession.query.filter_by(user_email=CHECK_USER).count()
+    for i in range(existing, session_count):
+        session = ChatSession(user_email=CHECK_USER, title=f"Check {i}", summary="", assistant_id=1, goal_ids=[1])
+        db.session.add(session)
+        db.session.flush()
+        db.session.add_all([
+            ChatMessage(session_id=session.id, seq=seq, role="user" if seq % 2 else "assistant",
+                        content=f"message {seq}", token_count=2)
+            for seq in range(1, messages_per_session + 1)
+        ])
+        session.message_count = messages_per_session
+    db.session.commit()
+    return ChatSession.query.filter_by(user_email=CHECK_USER).first().id
+
+def count_statements(app, view, path, **view_args):
+    """Statements one request to an (unauthenticated) view sends, from an empty identity map."""
+    db.session.expunge_all()
+    with app.test_request_context(path):
+        with StatementCounter(db.engine) as counter:
+            response = view.__wrapped__(user_email=CHECK_USER, **view_args)
+        status = response[1] if isinstance(response, tuple) else response.status_code
+        if status != 200:
+            raise RuntimeError(f"{path} returned {status}")
+    return counter.count
+
+def measure(app, session_id):
+    assistant_catalog.invalidate()
+    return {
+        "GET /sessions (cold catalog)": count_statements(app, get_sessions, "/sessions"),
+        "GET /sessions": count_statements(app, get_sessions, "/sessions"),
+        "GET /sessions?limit=20": count_statements(app, get_sessions, "/sessions?limit=20"),
+        "GET /sessions/<id>": count_statements(app, get_session_messages, f"/sessions/{session_id}", session_id=session_id),
+        "GET /sessions/<id>?limit=20": count_statements(
+            app, get_session_messages, f"/sessions/{session_id}?limit=20", session_id=session_id
+        )
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Query-count regression check for the session list and detail handlers. Runs them against '
+                    'an in-memory SQLite database at several sizes and exits 1 if any handler sends more '
+                    'statements than its budget, or more as the data grows (an N+1).'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50], help='Sessions (and messages per session) to check with')
+    args = parser.parse_args()
+
+    app = create_check_app()
+    with app.app_context():
+        for model in (Assistant, Goals, ChatSession, ChatMessage):
+            model.__table__.create(db.engine)
+        db.session.add(Assistant(id=1, name="Coach", system_prompt="", created_by="admin", short_desc=""))
+        db.session.commit()
+
+        results = []
+        for size in sorted(args.sizes):
+            session_id = seed(size, size)
+            results.append((size, measure(app, session_id)))
+
+    failures = []
+    print(f"{'handler':<30}" + "".join(f"{size:>8}" for size, _ in results) + f"{'budget':>8}")
+    for handler, budget in QUERY_BUDGETS.items():
+        counts = [counts[handler] for _, counts in results]
+        print(f"{handler:<30}" + "".join(f"{count:>8}" for count in counts) + f"{budget:>8}")
+        if max(counts) > budget or len(set(counts)) > 1:
+            failures.append(handler)
+
+    if failures:
+        print(f"FAIL: statement count over budget or growing with the data for {', '.join(failures)}")
+        sys.exit(1)
+    print("OK: every handler within its statement budget")
+
+if __name__ == "__main__":
+    main()
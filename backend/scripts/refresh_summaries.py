@@ -4,26 +4,51 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.__init__ import create_app, db
 from app.models.chat_session import ChatSession
+from app.models.chat_message import ChatMessage
 from app.models.user_summary import UserSummary
+from app.models.refresh_checkpoint import RefreshCheckpoint
 from app.services.ai_service import (
     generateSessionSummary,
     generateUserSummary,
-    generate_embedding,
-    analyze_sentiment
+    generate_embeddings,
+    analyze_sentiment,
+    get_sentiment_analyzer,
+    secondary_model,
+    sessionSummaryMaxTokens
 )
+from app.services import token_budget
+from app.services.openai_client import CircuitOpenError, breakerCooldown
+from app.utils.rate_limit import RateLimiter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from flask import current_app
-import json
 import logging
 import argparse
-from datetime import datetime, timezone
-from sqlalchemy import text
+from itertools import islice
+from sqlalchemy import text, update, exists, and_, or_, true, func, cast, BigInteger
+import multiprocessing
+import time
 from app.routes.chat_routes import update_user_summary  # Add this import at the top
-from app.models.session_sentiments import SessionSentiments
+from app.models.session_sentiments import SessionSentiments, sentiment_label
+from app.services.vector_index import rebuild_user_index
+from app.utils.embeddings import encode_embedding
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sessions per embeddings pass: each chunk is embedded with a few bulk requests and written with one bulk UPDATE
+UPDATE_CHUNK_SIZE = 500
+# Regenerated summaries are written and checkpointed this many at a time, so a crash loses little LLM work
+SUMMARY_CHUNK_SIZE = 50
+# Sessions per sentiment chunk: scored across the process pool, then written with one upsert
+SENTIMENT_CHUNK_SIZE = 2000
+# Rows fetched per round trip when streaming sessions from the server-side cursor
+STREAM_BATCH_SIZE = 1000
+# Times a summary request waits out an open OpenAI circuit breaker before the session counts as failed
+BREAKER_WAITS = 5
+
+STATUS_MODES = ('include', 'exclude', 'only')
+
 def get_session_filter_preferences():
     """Get user preferences for which types of sessions to include"""
     print("\nSession Filter Options:")
@@ -35,98 +60,302 @@ def get_session_filter_preferences():
     specific_session = input("\nEnter specific session ID (or press Enter to skip): ").strip()
     specific_user = input("Enter specific user email (or press Enter to skip): ").strip()
     
+    session_id = int(specific_session) if specific_session.isdigit() else None
     return {
-        'include_ended': include_ended,
-        'include_archived': include_archived,
-        'include_deleted': include_deleted,
-        'session_id': int(specific_session) if specific_session.isdigit() else None,
-        'user_email': specific_user if specific_user else None
+        'ended': 'include' if include_ended else 'exclude',
+        'archived': 'include' if include_archived else 'exclude',
+        'deleted': 'include' if include_deleted else 'exclude',
+        'session_id_ranges': [(session_id, session_id)] if session_id else None,
+        'user_emails': [specific_user] if specific_user else None,
+        'shard': None
     }
 
+def get_cli_filter_preferences(args):
+    """Build filter preferences from command-line flags, without prompting"""
+    user_emails = list(args.user_emails or [])
+    if args.user_file:
+        with open(args.user_file) as user_file:
+            user_emails.extend(line.strip() for line in user_file if line.strip())
+
+    return {
+        'ended': args.ended or 'include',
+        'archived': args.archived or 'include',
+        'deleted': args.deleted or 'include',
+        'session_id_ranges': args.session_ids,
+        'user_emails': user_emails or None,
+        'shard': args.shard
+    }
+
+def parse_session_id_ranges(value):
+    """Parse '1-100,250,300-' into [(1, 100), (250, 250), (300, None)]; either end of a range may be left open."""
+    ranges = []
+    try:
+        for part in value.split(','):
+            part = part.strip()
+            if '-' in part:
+                low, high = part.split('-', 1)
+                ranges.append((int(low) if low else None, int(high) if high else None))
+            elif part:
+                ranges.append((int(part), int(part)))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid session id range list: '{value}'")
+    if not ranges:
+        raise argparse.ArgumentTypeError("empty session id range list")
+    return ranges
+
+def parse_shard(value):
+    """Parse 'i/n' (0 <= i < n) into (i, n)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected i/n")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected 0 <= i < n")
+    return index, count
+
+def user_filter_conditions(user_email_column, preferences):
+    """
+    SQL conditions on a user_email column for the user list and shard preferences.
+    The shard is Postgres's hashtext() of the email, so every process (and the database) agrees on it
+    and no user list has to be sent over; widened to bigint so abs() can't overflow.
+    """
+    conditions = []
+    if not preferences:
+        return conditions
+    if preferences.get('user_emails'):
+        conditions.append(user_email_column.in_(preferences['user_emails']))
+    if preferences.get('shard'):
+        index, count = preferences['shard']
+        conditions.append(func.abs(cast(func.hashtext(user_email_column), BigInteger)) % count == index)
+    return conditions
+
 def get_filtered_sessions(preferences):
     """Get sessions based on filter preferences"""
+    return filtered_sessions_query(preferences).all()
+
+def filtered_sessions_query(preferences):
+    """Query for the sessions matching the filter preferences, ordered by id. No preferences means every session."""
     query = ChatSession.query
+    if not preferences:
+        return query.order_by(ChatSession.id.asc())
     
     # Build query based on preferences
     conditions = []
     
-    if not preferences['include_ended']:
-        conditions.append(ChatSession.is_ended == False)
-    
-    if not preferences['include_archived']:
-        conditions.append(ChatSession.is_archived == False)
+    for name, column in (('ended', ChatSession.is_ended),
+                         ('archived', ChatSession.is_archived),
+                         ('deleted', ChatSession.is_deleted)):
+        mode = preferences.get(name, 'include')
+        if mode == 'exclude':
+            conditions.append(column == False)
+        elif mode == 'only':
+            conditions.append(column == True)
         
-    if not preferences['include_deleted']:
-        conditions.append(ChatSession.is_deleted == False)
+    # Add session id range filters
+    if preferences.get('session_id_ranges'):
+        range_conditions = []
+        for low, high in preferences['session_id_ranges']:
+            bounds = []
+            if low is not None:
+                bounds.append(ChatSession.id >= low)
+            if high is not None:
+                bounds.append(ChatSession.id <= high)
+            range_conditions.append(and_(true(), *bounds))
+        conditions.append(or_(*range_conditions))
         
-    # Add specific session filter
-    if preferences.get('session_id'):
-        conditions.append(ChatSession.id == preferences['session_id'])
-        
-    # Add specific user filter
-    if preferences.get('user_email'):
-        conditions.append(ChatSession.user_email == preferences['user_email'])
+    # Add user list and shard filters
+    conditions.extend(user_filter_conditions(ChatSession.user_email, preferences))
     
     # Apply all conditions
     for condition in conditions:
         query = query.filter(condition)
     
     # Order by id ascending
-    query = query.order_by(ChatSession.id.asc())
-    
-    return query.all()
+    return query.order_by(ChatSession.id.asc())
+
+def chunked(items, size):
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+def stream_sessions(query, run_name=None):
+    """
+    Stream (id, user_email, summary) rows for the sessions a query matches, skipping those the run has
+    checkpointed. Rows come from a server-side cursor on a connection of their own, so memory stays flat
+    and the caller can keep committing on db.session while iterating.
+    """
+    query = query.with_entities(ChatSession.id, ChatSession.user_email, ChatSession.summary)
+    if run_name:
+        query = query.filter(~exists().where(
+            RefreshCheckpoint.run_name == run_name,
+            RefreshCheckpoint.session_id == ChatSession.id
+        ))
+    logger.info(f"Found {query.order_by(None).count()} sessions matching filter criteria")
 
-def refresh_session_summaries(filter_preferences=None):
-    """Refresh all session summaries"""
+    with db.engine.connect() as connection:
+        yield from connection.execution_options(yield_per=STREAM_BATCH_SIZE).execute(query.statement)
+
+def summarize_concurrently(sessions, load_messages, workers=1, rate_limiter=None):
+    """
+    Generate summaries for (id, user_email) rows on a pool of worker threads, yielding
+    {'id', 'user_email', 'summary'} dicts in completion order, with summary None for a failed session. load_messages(session_id) runs on the
+    worker thread. At most 2 * workers sessions are in flight, so memory doesn't grow with the input.
+    With a rate_limiter, each request first reserves its prompt tokens plus the completion limit.
+    While the OpenAI circuit breaker is open,
+    a request waits out the cooldown and tries again, up to BREAKER_WAITS times.
+    """
+    def summarize(session_id):
+        messages = load_messages(session_id)
+        if rate_limiter:
+            prompt_tokens = sum(token_budget.message_tokens(message, secondary_model) for message in messages)
+            rate_limiter.acquire(prompt_tokens + sessionSummaryMaxTokens)
+        for waits in range(BREAKER_WAITS + 1):
+            try:
+                return generateSessionSummary(messages, raise_errors=True)
+            except CircuitOpenError:
+                if waits == BREAKER_WAITS:
+                    raise
+                time.sleep(breakerCooldown)
+
+    sessions = iter(sessions)
+    in_flight = {}
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresh-summary") as executor:
+        while True:
+            while not exhausted and len(in_flight) < 2 * workers:
+                session = next(sessions, None)
+                if session is None:
+                    exhausted = True
+                    break
+                in_flight[executor.submit(summarize, session.id)] = session
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                session = in_flight.pop(future)
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    logger.error(f"Error summarizing session {session.id}: {str(e)}")
+                    summary = None
+                yield {'id': session.id, 'user_email': session.user_email, 'summary': summary}
+
+def write_session_updates(entries, write_summary=True, run_name=None):
+    """
+    Embed the sessions' summaries with bulk embedding requests and write them back with one
+    bulk UPDATE by primary key, then commit. entries: dicts with id, user_email and summary;
+    sessions whose summary is None (it failed) are left untouched.
+    With run_name, the sessions that were fully updated are checkpointed in the same transaction,
+    so a rerun retries the failed ones. A new summary whose embedding failed is written without
+    an embedding; otherwise a session whose embedding failed keeps its old one.
+    Returns the number of sessions fully updated.
+    """
+    entries = [entry for entry in entries if entry['summary'] is not None]
+    embeddings = generate_embeddings([entry['summary'] for entry in entries])
+    rows = []
+    completed = []
+    for entry, embedding in zip(entries, embeddings):
+        row = {'id': entry['id']}
+        if write_summary:
+            row['summary'] = entry['summary']
+        if embedding is not None:
+            row['embedding'] = encode_embedding(embedding)
+            completed.append(entry['id'])
+        else:
+            logger.warning(f"Failed to generate embedding for session {entry['id']}")
+            if write_summary:
+                row['embedding'] = None  # Don't leave the old summary's embedding next to the new summary
+        if len(row) > 1:
+            rows.append(row)
+
+    if rows:
+        db.session.execute(update(ChatSession), rows)
+    if run_name:
+        RefreshCheckpoint.record(run_name, completed)
+    db.session.commit()
+    return len(completed)
+
+def log_failed_sessions(failed, task, run_name=None):
+    """Report the sessions a refresh failed on; they are not checkpointed, so a rerun of the run retries them."""
+    if not failed:
+        return
+    retry = f"; rerun with --run-name {run_name} to retry them" if run_name else ""
+    logger.warning(f"{failed} sessions could not be fully refreshed ({task}) and were not checkpointed{retry}")
+
+def rebuild_vector_indexes(user_emails):
+    """Rebuild each touched user's vector index once, instead of syncing it session by session."""
+    for user_email in sorted(user_emails):
+        try:
+            rebuild_user_index(user_email)
+        except Exception as e:
+            logger.error(f"Error rebuilding vector index for user {user_email}: {str(e)}")
+
+def load_session_messages(app):
+    """Message loader for summarize_concurrently: each call uses its own app context, so its own DB session."""
+    def load_messages(session_id):
+        with app.app_context():
+            session = db.session.get(ChatSession, session_id)
+            return session.get_messages(with_token_counts=True)
+    return load_messages
+
+def refresh_session_summaries(filter_preferences=None, workers=1, rate_limiter=None, run_name=None):
+    """
+    Refresh all session summaries, generating them on `workers` threads under the rate limiter.
+    With run_name, finished sessions are checkpointed and a rerun with the same name skips them.
+    """
     logger.info("Starting session summaries refresh...")
     
     if filter_preferences is None:
         filter_preferences = get_session_filter_preferences()
     
-    sessions = get_filtered_sessions(filter_preferences)
+    sessions = stream_sessions(filtered_sessions_query(filter_preferences), run_name and f"{run_name}:sessions")
+    summaries = summarize_concurrently(
+        sessions,
+        load_session_messages(current_app._get_current_object()),
+        workers=workers,
+        rate_limiter=rate_limiter
+    )
     count = 0
+    failed = 0
     
-    logger.info(f"Found {len(sessions)} sessions matching filter criteria")
-    
-    for session in sessions:
+    user_emails = set()
+    for entries in chunked(summaries, SUMMARY_CHUNK_SIZE):
         try:
-            messages = json.loads(session.messages)
-            new_summary = generateSessionSummary(messages)
-            session.summary = new_summary
-            
-            # Generate new embedding for the summary
-            new_embedding = generate_embedding(new_summary)
-            session.embedding = json.dumps(new_embedding)
-            
-            db.session.add(session)
-            db.session.commit()
-            count += 1
-            logger.info(f"Updated summary for session {session.id}")
+            # Embed the chunk's new summaries together and write them back in one statement
+            updated = write_session_updates(entries, run_name=run_name and f"{run_name}:sessions")
+            count += updated
+            failed += len(entries) - updated
+            user_emails.update(entry['user_email'] for entry in entries if entry['summary'] is not None)
+            logger.info(f"Updated summaries for {updated} sessions ({count} so far, {failed} failed)")
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating session {session.id}: {str(e)}")
+            failed += len(entries)
+            logger.error(f"Error writing summaries for sessions {[entry['id'] for entry in entries]}: {str(e)}")
+
+    rebuild_vector_indexes(user_emails)
 
     refresh_user_summaries(filter_preferences)
     
     logger.info(f"Completed refreshing {count} session summaries")
+    log_failed_sessions(failed, "summaries", run_name)
     return count, filter_preferences
 
 def refresh_user_summaries(filter_preferences=None):
     """Refresh all user summaries"""
     logger.info("Starting user summaries refresh...")
     
-    # Get unique user emails from user summary table
     # Get unique user emails from user summary table, filtered by preferences if specified
-    query = db.session.query(UserSummary.user_email.distinct())
-    if filter_preferences and filter_preferences.get('user_email'):
-        query = query.filter(UserSummary.user_email == filter_preferences['user_email'])
-    user_emails = query.all()
+    query = db.session.query(UserSummary.user_email.distinct()).filter(
+        *user_filter_conditions(UserSummary.user_email, filter_preferences)
+    )
+    user_emails = [user_email for (user_email,) in query]
     count = 0
     
-    for (user_email,) in user_emails:  # Unpack the tuple from the query
+    for user_email in user_emails:
         try:
-            # Use existing update_user_summary function
-            update_user_summary(user_email)
+            # Use existing update_user_summary function, rebuilding from every session
+            update_user_summary(user_email, full=True, raise_errors=True)
             count += 1
             logger.info(f"Updated summary for user {user_email}")
             
@@ -136,49 +365,42 @@ def refresh_user_summaries(filter_preferences=None):
     logger.info(f"Completed refreshing {count} user summaries")
     return count
 
-def refresh_embeddings(filter_preferences=None):
-    """Refresh all session embeddings"""
+def refresh_embeddings(filter_preferences=None, run_name=None):
+    """
+    Refresh all session embeddings. With run_name, finished sessions are checkpointed
+    and a rerun with the same name skips them.
+    """
     logger.info("Starting embeddings refresh...")
     
-    # Get all sessions based on filters
-    query = ChatSession.query
-    if filter_preferences:
-        if not filter_preferences['include_ended']:
-            query = query.filter(ChatSession.ended == False)
-        if not filter_preferences['include_archived']:
-            query = query.filter(ChatSession.archived == False)
-        if not filter_preferences['include_deleted']:
-            query = query.filter(ChatSession.deleted == False)
-    
-    sessions = query.all()
+    # Sessions without a summary have nothing to embed
+    query = filtered_sessions_query(filter_preferences).filter(
+        ChatSession.summary.isnot(None),
+        ChatSession.summary != ''
+    )
+    sessions = stream_sessions(query, run_name and f"{run_name}:embeddings")
     count = 0
-    
-    logger.info(f"Found {len(sessions)} sessions to process")
-    
-    for session in sessions:
+    failed = 0
+
+    user_emails = set()
+    for chunk in chunked(sessions, UPDATE_CHUNK_SIZE):
+        entries = [{'id': session.id, 'user_email': session.user_email, 'summary': session.summary} for session in chunk]
         try:
-            if not session.summary:
-                logger.warning(f"Skipping session {session.id} - no summary found")
-                continue
-            
-            # Generate embedding for session summary
-            embedding = generate_embedding(session.summary)
-            if embedding:
-                session.embedding = json.dumps(embedding)
-                db.session.add(session)
-                db.session.commit()
-                count += 1
-                logger.info(f"Updated embedding for session {session.id}")
-            else:
-                logger.warning(f"Failed to generate embedding for session {session.id}")
-                
+            updated = write_session_updates(entries, write_summary=False, run_name=run_name and f"{run_name}:embeddings")
+            count += updated
+            failed += len(entries) - updated
+            user_emails.update(entry['user_email'] for entry in entries)
+            logger.info(f"Updated embeddings for sessions {entries[0]['id']}-{entries[-1]['id']} ({count} so far, {failed} failed)")
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating embedding for session {session.id}: {str(e)}")
+            failed += len(entries)
+            logger.error(f"Error updating embeddings for sessions {entries[0]['id']}-{entries[-1]['id']}: {str(e)}")
+
+    rebuild_vector_indexes(user_emails)
 
     refresh_user_summaries(filter_preferences)
     
     logger.info(f"Completed refreshing embeddings for {count} sessions")
+    log_failed_sessions(failed, "embeddings", run_name)
     return count
 
 def delete_marked_chats():
@@ -219,53 +441,107 @@ def delete_marked_chats():
         logger.error(f"Error during deletion process: {str(e)}")
         raise
 
-def refresh_session_sentiments(filter_preferences=None):
-    """Refresh all session sentiments"""
+def load_user_messages(session_ids):
+    """(message id, session id, content) of the chunk's user messages, with one query for the whole chunk."""
+    return ChatMessage.query.with_entities(ChatMessage.id, ChatMessage.session_id, ChatMessage.content).filter(
+        ChatMessage.session_id.in_(session_ids),
+        ChatMessage.role == 'user'
+    ).order_by(ChatMessage.session_id, ChatMessage.seq).all()
+
+def score_sentiments(message_texts):
+    """Process-pool task: VADER compound scores for a batch of texts. Runs in a forked worker that already has the lexicon."""
+    return [analyze_sentiment(message_text)['sentiment_score'] for message_text in message_texts]
+
+def submit_sentiment_chunk(executor, chunk, processes):
+    """Load a chunk's user messages and split the scoring evenly across the worker processes."""
+    session_users = {session.id: session.user_email for session in chunk}
+    messages = load_user_messages(list(session_users.keys()))
+    db.session.rollback()  # End the read transaction; the chunk is written in its own
+
+    batch_size = max(1, -(-len(messages) // processes))
+    batches = list(chunked(messages, batch_size))
+    futures = [executor.submit(score_sentiments, [content or '' for _, _, content in batch]) for batch in batches]
+    return session_users, batches, futures
+
+def write_sentiment_chunk(session_users, batches, futures, run_name=None):
+    """
+    Wait for a chunk's scores, then in one transaction: store each message's score with one bulk UPDATE,
+    replace each session's aggregate with one upsert, and checkpoint the chunk.
+    Sessions without user messages have nothing to score and get no record.
+    session_users maps each of the chunk's session ids to its user_email.
+    """
+    message_scores = []
+    aggregates = {}  # session_id -> [message_count, score_sum]
+    for batch, future in zip(batches, futures):
+        for (message_id, session_id, _), score in zip(batch, future.result()):
+            message_scores.append({'id': message_id, 'sentiment_score': score})
+            aggregate = aggregates.setdefault(session_id, [0, 0.0])
+            aggregate[0] += 1
+            aggregate[1] += score
+
+    rows = [
+        {
+            'session_id': session_id,
+            'user_email': session_users[session_id],
+            'sentiment': sentiment_label(score_sum / message_count),
+            'sentiment_score': score_sum / message_count,
+            'message_count': message_count,
+            'score_sum': score_sum
+        }
+        for session_id, (message_count, score_sum) in aggregates.items()
+    ]
+    if message_scores:
+        db.session.execute(update(ChatMessage), message_scores)
+    SessionSentiments.upsert(rows)
+    if run_name:
+        RefreshCheckpoint.record(run_name, list(session_users.keys()))
+    db.session.commit()
+    return len(rows)
+
+def write_pending_sentiments(pending, run_name):
+    """write_sentiment_chunk for a submitted chunk, logging (not raising) failures so the next chunks still run."""
+    session_users, batches, futures = pending
+    session_ids = sorted(session_users.keys())
+    try:
+        written = write_sentiment_chunk(session_users, batches, futures, run_name)
+        logger.info(f"Updated sentiments for sessions {session_ids[0]}-{session_ids[-1]} ({written} scored)")
+        return written
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error updating sentiments for sessions {session_ids[0]}-{session_ids[-1]}: {str(e)}")
+        return 0
+
+def refresh_session_sentiments(filter_preferences=None, processes=None, run_name=None):
+    """
+    Refresh all session sentiments from scratch. Sessions are streamed in chunks, their user messages scored
+    with VADER across a pool of `processes` worker processes (default: one per CPU), and each chunk is written
+    with one bulk UPDATE of the message scores and one upsert of the session aggregates.
+    The next chunk is loaded while the previous one is scored. With run_name, finished sessions are
+    checkpointed and a rerun with the same name skips them.
+    """
     logger.info("Starting session sentiments refresh...")
     
     if filter_preferences is None:
         filter_preferences = get_session_filter_preferences()
-    
-    sessions = get_filtered_sessions(filter_preferences)
+    processes = processes or os.cpu_count() or 1
+    run_name = run_name and f"{run_name}:sentiments"
+
+    # Load the lexicon once here: fails fast if it isn't provisioned, and forked workers inherit it
+    get_sentiment_analyzer()
+
+    sessions = stream_sessions(filtered_sessions_query(filter_preferences), run_name)
     count = 0
     
-    logger.info(f"Found {len(sessions)} sessions matching filter criteria")
-    
-    for session in sessions:
-        try:
-            messages = json.loads(session.messages)
-            # Only include user messages
-            user_messages = [msg.get('content', '') for msg in messages if msg.get('role') == 'user']
-            message_text = " ".join(user_messages)
-            
-            # Get or create SessionSentiments for this chat session
-            sentiment = SessionSentiments.query.filter_by(session_id=session.id).first()
-            if not sentiment:
-                now = datetime.now(timezone.utc)
-                sentiment = SessionSentiments(
-                    session_id=session.id,
-                    created_at=now,
-                    updated_at=now
-                )
-            
-            # Analyze sentiment for the combined message text
-            sentiment_analysis = analyze_sentiment(message_text)
-            
-            # Update sentiment values
-            sentiment.user_email = session.user_email
-            sentiment.sentiment = sentiment_analysis.get('sentiment')
-            sentiment.sentiment_score = sentiment_analysis['sentiment_score']
-            sentiment.updated_at = datetime.now(timezone.utc)
-            
-            db.session.add(sentiment)
-            db.session.commit()
-            
-            count += 1
-            logger.info(f"Updated sentiments for session {session.id}")
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error updating sentiments for session {session.id}: {str(e)}")
+    # Fork explicitly, so workers share the loaded analyzer instead of re-importing the app
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork")) as executor:
+        pending = None
+        for chunk in chunked(sessions, SENTIMENT_CHUNK_SIZE):
+            submitted = submit_sentiment_chunk(executor, chunk, processes)
+            if pending:
+                count += write_pending_sentiments(pending, run_name)
+            pending = submitted
+        if pending:
+            count += write_pending_sentiments(pending, run_name)
     
     logger.info(f"Completed refreshing sentiments for {count} sessions")
     return count
@@ -276,28 +552,68 @@ def main():
     parser.add_argument('--users', action='store_true', help='Refresh user summaries')
     parser.add_argument('--embeddings', action='store_true', help='Refresh embeddings')
     parser.add_argument('--all', action='store_true', help='Refresh everything')
-    parser.add_argument('--no-prompt', action='store_true', help='Skip prompts and include all sessions')
+    parser.add_argument('--no-prompt', action='store_true',
+                        help='Skip prompts; filters not given as flags include all sessions')
     parser.add_argument('--delete-marked', action='store_true', help='Permanently delete marked chats')
     parser.add_argument('--sentiments', action='store_true', help='Refresh session sentiments')
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent session summary requests')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Worker processes for sentiment scoring (default: one per CPU)')
+    parser.add_argument('--rpm', type=int, default=None, help='Client-side limit on LLM requests per minute')
+    parser.add_argument('--tpm', type=int, default=None, help='Client-side limit on LLM tokens per minute')
+    parser.add_argument('--run-name', default=None,
+                        help='Checkpoint finished sessions under this name; rerunning with it skips them')
+    parser.add_argument('--restart', action='store_true',
+                        help='Clear the --run-name checkpoints (for every shard) and start over')
+
+    # Session filters; giving any of them (or --no-prompt) skips the interactive prompts
+    filters = parser.add_argument_group('session filters')
+    filters.add_argument('--ended', choices=STATUS_MODES, help='Ended sessions (default: include)')
+    filters.add_argument('--archived', choices=STATUS_MODES, help='Archived sessions (default: include)')
+    filters.add_argument('--deleted', choices=STATUS_MODES, help='Soft-deleted sessions (default: include)')
+    filters.add_argument('--session-ids', type=parse_session_id_ranges, metavar='RANGES',
+                         help='Session ids and ranges, e.g. 1-500,812,1000- (open ends allowed)')
+    filters.add_argument('--user-emails', type=lambda value: [email.strip() for email in value.split(',') if email.strip()],
+                         metavar='EMAILS', help='Comma-separated user emails')
+    filters.add_argument('--user-file', metavar='PATH', help='File with one user email per line')
+    filters.add_argument('--shard', type=parse_shard, metavar='I/N',
+                         help='Only users whose email hash falls in shard I of N; run N processes with 0/N .. N-1/N')
     
     args = parser.parse_args()
     
     app = create_app()
     with app.app_context():
-        # Get filter preferences if needed
-        filter_preferences = get_session_filter_preferences()
+        # Prompt only when run interactively without any filter flags
+        filter_flags = (args.ended, args.archived, args.deleted, args.session_ids,
+                        args.user_emails, args.user_file, args.shard)
+        if args.no_prompt or any(flag is not None for flag in filter_flags) or not sys.stdin.isatty():
+            filter_preferences = get_cli_filter_preferences(args)
+            logger.info(f"Session filters: {filter_preferences}")
+        else:
+            filter_preferences = get_session_filter_preferences()
         
+        rate_limiter = RateLimiter(args.rpm, args.tpm) if args.rpm or args.tpm else None
+        if args.run_name and args.restart:
+            for task in ("sessions", "embeddings", "sentiments"):
+                cleared = RefreshCheckpoint.clear(f"{args.run_name}:{task}")
+                logger.info(f"Cleared {cleared} {task} checkpoints for run '{args.run_name}'")
+
         try:
             if args.delete_marked:
                 deleted_count = delete_marked_chats()
                 logger.info(f"Permanently deleted {deleted_count} marked chats")
             
             if args.all or args.sessions:
-                session_count, filter_preferences = refresh_session_summaries(filter_preferences)
+                session_count, filter_preferences = refresh_session_summaries(
+                    filter_preferences,
+                    workers=args.workers,
+                    rate_limiter=rate_limiter,
+                    run_name=args.run_name
+                )
                 logger.info(f"Updated {session_count} session summaries")
 
             if args.embeddings:
-                embedding_count = refresh_embeddings(filter_preferences)
+                embedding_count = refresh_embeddings(filter_preferences, run_name=args.run_name)
                 logger.info(f"Updated embeddings for {embedding_count} sessions")
                 
             if args.users:
@@ -305,7 +621,11 @@ def main():
                 logger.info(f"Updated {user_count} user summaries")
 
             if args.sentiments:
-                sentiment_count = refresh_session_sentiments(filter_preferences)
+                sentiment_count = refresh_session_sentiments(
+                    filter_preferences,
+                    processes=args.processes,
+                    run_name=args.run_name
+                )
                 logger.info(f"Updated sentiments for {sentiment_count} sessions")
                 
         except Exception as e:
@@ -0,0 +1,12 @@
+from app.__init__ import create_app
+from app.services.job_queue import run_worker
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+app = create_app()
+
+if __name__ == "__main__":
+    # Runs queued jobs (session summaries, embeddings, sentiment, user summaries) until stopped
+    with app.app_context():
+        run_worker()
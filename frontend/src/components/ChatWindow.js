@@ -327,7 +327,7 @@ const ChatWindow = ({ user, activeSession, isSidebarOpen, setIsSidebarOpen, sess
       if (!activeSession || isInitializingChat) return;
       
       const session = sessions.find(s => s.id === activeSession);
-      if (!session || session.messages?.length > 0) return;
+      if (!session || session.messages?.length > 0 || session.message_count > 0) return;
       
       try {
         setIsInitializingChat(true);
@@ -64,7 +64,7 @@ const ContributionGraph = ({ data, year, availableYears, onYearChange }) => {
     if (!date) return 'empty';
     const dateStr = formatDate(date);
     const dateData = data[dateStr];
-    return dateData?.timestamps?.length > 0 ? 'active' : 'inactive';
+    return dateData?.count > 0 ? 'active' : 'inactive';
   };
 
   // Generate month labels with their positions
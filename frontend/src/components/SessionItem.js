@@ -127,7 +127,7 @@ const SessionItem = ({
         )}
       </div>
       <div className="session-preview">
-        {session.messages?.length > 0 ? (
+        {session.messages?.length > 0 || session.message_count > 0 ? (
           <>
             <span className="assistant-label">{session.assistant_name || 'AI Assistant'}</span>
             <span className="timestamp">{getTimeDisplay(session.timestamp)}</span>